@@ -0,0 +1,65 @@
+import numpy as np
+
+from grid_mcmc import csr_adjacency, state_dtype
+
+
+def chain_generators(n_chains, seed=None):
+    """One independent numpy Generator per chain, spawned from a single seed.
+
+    Chain j always gets the same stream for the same seed, no matter how many
+    other chains run next to it.
+    """
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(n_chains)]
+
+
+def iter_batched_walk(g, starts, steps, seed=None, chunk_size=1024):
+    """Advance len(starts) simple random walkers on g in lock-step.
+
+    Yields (rows, N) integer arrays of node ids into nodes, chunk by chunk,
+    where row t of the concatenated output is the position of every walker
+    after t steps (row 0 holds the starting nodes). Yields nodes first so the
+    ids can be translated back to graph nodes.
+    """
+    nodes, indptr, indices, degree = csr_adjacency(g)
+    index = {x: i for i, x in enumerate(nodes)}
+    position = np.array([index[x] for x in starts], dtype=np.int64)
+    rngs = chain_generators(len(position), seed)
+    dtype = state_dtype(len(nodes))
+    yield nodes
+
+    # Uniforms for a whole chunk are drawn per chain (column) so every chain
+    # keeps its own stream; the walk itself is then stepped for all chains at
+    # once.
+    u = np.empty((chunk_size, len(position)))
+    # Walkers on a node without neighbors (an island of a dual graph) stay put.
+    islands = bool((degree == 0).any())
+    done = 0
+    while done < steps:
+        m = min(chunk_size, steps - done)
+        for j, rng in enumerate(rngs):
+            u[:m, j] = rng.random(m)
+        out = np.empty((m, len(position)), dtype=dtype)
+        for t in range(m):
+            out[t] = position
+            if islands:
+                moving = degree[position] > 0
+                p = position[moving]
+                position = position.copy()
+                position[moving] = indices[indptr[p] + (u[t, moving] * degree[p]).astype(np.int64)]
+            else:
+                position = indices[indptr[position] + (u[t] * degree[position]).astype(np.int64)]
+        done += m
+        yield out
+
+
+def batched_walk(g, starts, steps, seed=None, chunk_size=1024):
+    """Run iter_batched_walk to completion.
+
+    Returns (nodes, trajectory) with trajectory a (steps x N) array.
+    """
+    chunks = iter_batched_walk(g, starts, steps, seed=seed, chunk_size=chunk_size)
+    nodes = next(chunks)
+    trajectory = list(chunks)
+    if not trajectory:
+        return nodes, np.empty((0, len(starts)), dtype=state_dtype(len(nodes)))
+    return nodes, np.concatenate(trajectory)
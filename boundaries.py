@@ -0,0 +1,103 @@
+import os
+import shutil
+
+import geopandas as gpd
+import pyarrow.parquet as pq
+import requests
+
+# Constants
+TIGER_HOST = "https://www2.census.gov/geo/tiger"
+CACHE_DIR = "boundary_cache"
+
+# Summary level codes used in the 2010 cartographic boundary file names
+# (gz_2010_us_050_00_20m.zip) and the names used from 2013 on
+# (cb_2017_us_county_20m.zip) and in TIGER/Line (tl_2012_25_sldu.zip).
+GZ_CODES = {"state": "040", "county": "050", "tract": "140", "block group": "150",
+            "sldu": "610", "sldl": "620"}
+NAMES = {"state": "state", "county": "county", "tract": "tract", "block group": "bg",
+         "sldu": "sldu", "sldl": "sldl"}
+
+
+def boundary_path(product, vintage, level, resolution="20m", state="us"):
+    """Path of a boundary zip below the TIGER host.
+
+    product is "cb" for cartographic boundary files or "tiger" for TIGER/Line
+    shapefiles; state is "us" or a 2-digit FIPS code.
+    """
+    vintage = int(vintage)
+    if product == "cb":
+        if vintage == 2010:
+            name = "gz_2010_{}_{}_00_{}.zip".format(state, GZ_CODES[level], resolution)
+            return "/".join(["GENZ2010", name])
+        name = "cb_{}_{}_{}_{}.zip".format(vintage, state, NAMES[level], resolution)
+        return "/".join(["GENZ{}".format(vintage), "shp", name])
+    if product == "tiger":
+        name = "tl_{}_{}_{}.zip".format(vintage, state, NAMES[level])
+        return "/".join(["TIGER{}".format(vintage), NAMES[level].upper(), name])
+    raise ValueError("unknown boundary product {!r}".format(product))
+
+
+class BoundaryCache:
+    """Local cache of Census boundary files, stored as GeoParquet.
+
+    The first load of a (product, vintage, level, resolution, state) downloads
+    the zip once and converts it to GeoParquet with rows in Hilbert order and
+    a bbox covering column, which acts as the spatial index: later loads of a
+    bounding box or a few states only decode the row groups that can match.
+    host may be a local directory laid out like the TIGER server.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, host=TIGER_HOST, row_group_size=1024):
+        self.cache_dir = cache_dir
+        self.host = host
+        self.row_group_size = row_group_size
+
+    def download(self, relpath):
+        """Local copy of the zip at relpath, downloading it if needed."""
+        target = os.path.join(self.cache_dir, "zip", *relpath.split("/"))
+        if os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = target + ".part"
+        if self.host.startswith(("http://", "https://")):
+            with requests.get("/".join([self.host, relpath]), stream=True, timeout=300) as r:
+                r.raise_for_status()
+                with open(partial, "wb") as f:
+                    for chunk in r.iter_content(1 << 20):
+                        f.write(chunk)
+        else:
+            shutil.copyfile(os.path.join(self.host, *relpath.split("/")), partial)
+        os.replace(partial, target)
+        return target
+
+    def parquet(self, product, vintage, level, resolution="20m", state="us"):
+        """GeoParquet copy of the boundary file, converting it on first use."""
+        relpath = boundary_path(product, vintage, level, resolution, state)
+        target = os.path.join(self.cache_dir, "parquet",
+                              os.path.basename(relpath)[:-len(".zip")] + ".parquet")
+        if os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        geo = gpd.read_file("zip://" + self.download(relpath))
+        geo = geo.iloc[geo.hilbert_distance().argsort()].reset_index(drop=True)
+        partial = target + ".part"
+        geo.to_parquet(partial, write_covering_bbox=True, row_group_size=self.row_group_size)
+        os.replace(partial, target)
+        return target
+
+    def load(self, product, vintage, level, resolution="20m", state="us",
+             bbox=None, states=None, columns=None):
+        """Boundaries as a GeoDataFrame.
+
+        bbox (minx, miny, maxx, maxy, in the file's CRS) and states (2-digit
+        FIPS codes) limit what is read; columns limits the attribute columns.
+        """
+        path = self.parquet(product, vintage, level, resolution, state)
+        filters = None
+        if states is not None:
+            names = pq.read_schema(path).names
+            state_column = "STATEFP" if "STATEFP" in names else "STATE"
+            filters = [(state_column, "in", [str(s) for s in states])]
+        if columns is not None and "geometry" not in columns:
+            columns = list(columns) + ["geometry"]
+        return gpd.read_parquet(path, columns=columns, bbox=bbox, filters=filters)
@@ -84,6 +84,18 @@ print(base_url + "/variables.html")
 print(base_url + "/examples.html")
 
 
+# The same information is published as JSON (`variables.json` and `geography.json`). `CensusClient` (in `census_client.py`) downloads both once per year and data product and keeps them in a local index, so you can search variables without a browser. Requests are also checked against the index before they are sent, so a misspelled variable or a missing `in` geography fails immediately with a specific message.
+
+# In[ ]:
+
+
+from census_client import CensusClient
+
+client = CensusClient()
+print(client.search(year, dataset, "median household income", limit=5))
+print(client.table_variables(year, dataset, "B28003"))
+
+
 # # Requesting all variables from a particular table
 # 
 # You can request up to 50 variables in a single API request. You can provide these variable names as strings yourself, but a common need is to return all variables from a specific subject table. In this case, building the variable names programatically is easier. For example, Table B28003 "Presence Of A Computer And Type Of Internet Subscription In Household" has 6 columns. The variable names will all begin `"B28003_"` and the endings will run from `"001E"` to `"006E"`. We need a list of the numbers 1 through 6, converted to a string, with additional text added at the beginning and end.
@@ -0,0 +1,327 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Constants
+HOST = "https://api.census.gov/data"
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "census_api")
+
+# Status codes worth retrying: rate limiting and server-side trouble.
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# The API accepts at most this many variables per request.
+MAX_VARIABLES = 50
+
+# Negative values the Census uses in place of estimates that are missing,
+# not computed or not applicable.
+NULL_SENTINELS = {-111111111, -222222222, -333333333, -444444444, -555555555,
+                  -666666666, -777777777, -888888888, -999999999}
+
+
+class CensusAPIError(Exception):
+    """The API answered, but not with data (bad variable, bad geography, ...)."""
+
+
+def cache_key(year, dataset, get, for_, in_=None, host=HOST):
+    """The (host, year, dataset, get, for, in) key a response is cached under.
+
+    The host is part of the key so that responses from a test server and
+    from the real API never stand in for each other.
+    """
+    if not isinstance(get, str):
+        get = ",".join(get)
+    return json.dumps([host, str(year), dataset, get, for_, in_ or ""])
+
+
+def chunk_variables(variables, size=MAX_VARIABLES):
+    """Split a variable list into request-sized pieces."""
+    variables = list(variables)
+    return [variables[i:i + size] for i in range(0, len(variables), size)]
+
+
+def parse_column(values):
+    """Convert one column of API strings to a typed array while parsing.
+
+    Integers become a nullable Int64 array and decimals float64, with None
+    and the Census null sentinels as missing. Anything that does not parse
+    as a number (NAME, GEO_ID, ...) stays as strings.
+    """
+    raw = np.array(values, dtype=object)
+    missing = np.equal(raw, None)
+    if missing.all():
+        return pd.array(raw, dtype="string")
+    text = np.where(missing, "0", raw).astype(str)
+    try:
+        ints = text.astype(np.int64)
+    except ValueError:
+        try:
+            floats = text.astype(np.float64)
+        except ValueError:
+            return pd.array(raw, dtype="string")
+        floats[missing | np.isin(floats, list(NULL_SENTINELS))] = np.nan
+        return floats
+    missing |= np.isin(ints, list(NULL_SENTINELS))
+    return pd.arrays.IntegerArray(ints, missing)
+
+
+class ResponseCache:
+    """On-disk cache of API responses in a single sqlite file.
+
+    Entries older than ttl seconds are treated as missing, and once there are
+    more than max_entries the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=None, ttl=30 * 24 * 3600, max_entries=100000):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "responses.sqlite")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                         "key TEXT PRIMARY KEY, body TEXT, created REAL, used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT body, created FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, rows):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                             (key, json.dumps(rows), now, now))
+            count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                                 "ORDER BY used LIMIT ?)", (count - self.max_entries,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+class RateLimiter:
+    """Spaces requests so that at most rate of them start per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class CensusClient:
+    """Census API client with a pooled session, bounded concurrency, retries
+    and an on-disk response cache.
+
+    Responses are the raw JSON rows the API returns, header row first, just
+    like r.json() in census_api_intro.py. Requests are checked against the
+    dataset's variables.json and geography.json (kept in a
+    census_metadata.MetadataIndex) before they are sent, unless validate is
+    False.
+    """
+
+    def __init__(self, host=HOST, key=None, cache=None, max_workers=8,
+                 retries=5, backoff=0.5, rate=None, timeout=60, metadata=None,
+                 validate=True):
+        if metadata is None:
+            from census_metadata import MetadataIndex
+            metadata = MetadataIndex(host=host)
+        elif metadata.host != host:
+            raise ValueError("metadata index is for {}, not {}".format(metadata.host, host))
+        self.host = host
+        self.key = key
+        self.cache = ResponseCache() if cache is None else cache
+        self.metadata = metadata
+        self.validate_requests = validate
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate) if rate else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def base_url(self, year, dataset):
+        return "/".join([self.host, str(year), dataset])
+
+    def _request(self, url, predicates):
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                self.limiter.wait()
+            try:
+                r = self.session.get(url, params=predicates, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if r.status_code not in RETRY_STATUS:
+                    break
+                if attempt == self.retries:
+                    break
+            time.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+        if r.status_code != 200:
+            raise CensusAPIError("{} {}: {}".format(r.status_code, r.url, r.text.strip()))
+        try:
+            return r.json()
+        except ValueError:
+            raise CensusAPIError("not JSON from {}: {}".format(r.url, r.text.strip()[:200]))
+
+    def metadata_json(self, year, dataset, name):
+        """A metadata document of the dataset, e.g. variables.json, fetched directly."""
+        url = "/".join([self.base_url(year, dataset), name])
+        return self._request(url, {"key": self.key} if self.key else {})
+
+    def index(self, year, dataset):
+        """The metadata index, with (year, dataset) loaded."""
+        self.metadata.ensure(self, year, dataset)
+        return self.metadata
+
+    def validate(self, year, dataset, get, for_, in_=None):
+        """Raise census_metadata.CensusRequestError for a query the API would reject."""
+        self.index(year, dataset).validate(year, dataset, get, for_, in_)
+
+    def search(self, year, dataset, text, limit=20):
+        """Variables of the dataset matching text; see MetadataIndex.search."""
+        return self.index(year, dataset).search(year, dataset, text, limit=limit)
+
+    def get(self, year, dataset, get, for_, in_=None):
+        """Rows for one query, from the cache when possible."""
+        if self.validate_requests:
+            self.validate(year, dataset, get, for_, in_)
+        return self._get(year, dataset, get, for_, in_)
+
+    def _get(self, year, dataset, get, for_, in_=None):
+        key = cache_key(year, dataset, get, for_, in_, host=self.host)
+        rows = self.cache.get(key)
+        if rows is not None:
+            return rows
+        predicates = {"get": get if isinstance(get, str) else ",".join(get), "for": for_}
+        if in_:
+            predicates["in"] = in_
+        if self.key:
+            predicates["key"] = self.key
+        rows = self._request(self.base_url(year, dataset), predicates)
+        self.cache.put(key, rows)
+        return rows
+
+    def get_many(self, queries):
+        """Run many (year, dataset, get, for, in) queries concurrently.
+
+        Results come back in the order of queries. Every query is validated
+        before the first one is sent.
+        """
+        queries = list(queries)
+        if self.validate_requests:
+            for q in queries:
+                self.validate(*q)
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            return list(pool.map(lambda q: self._get(*q), queries))
+
+    def dataframe(self, year, dataset, get, for_, in_=None, columns=None):
+        """One query as a DataFrame, with the API's header unless columns is given."""
+        rows = self.get(year, dataset, get, for_, in_)
+        return pd.DataFrame(columns=columns or rows[0], data=rows[1:])
+
+    def table_variables(self, year, dataset, table):
+        """Estimate variables of a table, e.g. B28003 -> B28003_001E ... B28003_006E.
+
+        Looked up in the metadata index, without a request per table.
+        """
+        variables = self.index(year, dataset).table_variables(year, dataset, table)
+        if not variables:
+            raise CensusAPIError("{} {} has no table {}".format(year, dataset, table))
+        return variables
+
+    def labels(self, year, dataset, variables):
+        """{variable: descriptive column name} from the variable labels."""
+        return self.index(year, dataset).labels(year, dataset, variables)
+
+    def fetch_wide(self, year, dataset, variables, for_, in_=None, columns=None):
+        """Any number of variables for one geography, as a single DataFrame.
+
+        variables is a list of variable names or a table ID. The list is split
+        into requests of at most MAX_VARIABLES that run concurrently, and the
+        pieces are laid side by side on the geography columns the API returns
+        (state, county, ...) by writing each column into its final row
+        position, instead of merging DataFrames pairwise. Values are typed
+        while parsing with parse_column. columns optionally renames variables;
+        columns="labels" names them after their labels (see labels).
+        """
+        if isinstance(variables, str):
+            variables = self.table_variables(year, dataset, variables)
+        if isinstance(columns, str) and columns == "labels":
+            columns = self.labels(year, dataset, variables)
+        chunks = chunk_variables(variables)
+        results = self.get_many([(year, dataset, chunk, for_, in_) for chunk in chunks])
+        df = self.wide_frame(chunks, results, for_)
+        if columns is not None:
+            df = df.rename(columns=columns)
+        return df
+
+    def wide_frame(self, chunks, results, for_):
+        """Lay the responses to the requests for chunks of variables side by side.
+
+        results[k] holds the rows returned for chunks[k]; see fetch_wide.
+        """
+        header = results[0][0]
+        geo_columns = header[len(chunks[0]):]
+        n_geo = len(geo_columns)
+        position = {tuple(row[-n_geo:]): i for i, row in enumerate(results[0][1:])}
+        n = len(position)
+
+        data = {}
+        for chunk, rows in zip(chunks, results):
+            if rows[0][-n_geo:] != geo_columns or len(rows) - 1 != n:
+                raise CensusAPIError("requests for {} returned different geographies".format(for_))
+            body = rows[1:]
+            order = np.array([position[tuple(row[-n_geo:])] for row in body], dtype=np.int64)
+            inverse = np.empty(n, dtype=np.int64)
+            inverse[order] = np.arange(n)
+            for j, name in enumerate(chunk):
+                data[name] = parse_column([body[i][j] for i in inverse])
+        for j, name in enumerate(geo_columns):
+            data[name] = [row[len(chunks[0]) + j] for row in results[0][1:]]
+
+        return pd.DataFrame(data, copy=False)
+
+    def close(self):
+        self.session.close()
+        self.cache.close()
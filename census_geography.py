@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from census_client import chunk_variables
+
+# Summary levels from largest to smallest. Each level nests in the ones
+# before it.
+HIERARCHY = ["state", "county", "tract", "block group"]
+SUMMARY_LEVELS = {"state": "040", "county": "050", "tract": "140", "block group": "150"}
+
+# pandas dtype every fan_out file stores a variable as, by the predicateType
+# in variables.json; anything else (geography IDs, NAME) is stored as string.
+PREDICATE_DTYPES = {"int": "Int64", "float": "float64"}
+
+# Parent geographies the API insists on in the `in` predicate. Block groups
+# have to be requested one county at a time; see census_api_intro.py.
+REQUIRED_PARENTS = {
+    "state": [],
+    "county": [],
+    "tract": ["state"],
+    "block group": ["state", "county"],
+}
+
+
+def parent_ids(client, year, dataset, level, states=None):
+    """All ID tuples of the given level, optionally limited to some states.
+
+    state -> [("13",), ...], county -> [("13", "001"), ...], and so on.
+    """
+    if level == "state":
+        rows = client.get(year, dataset, "NAME", "state:*")
+        ids = [(row[-1],) for row in rows[1:]]
+        if states is not None:
+            ids = [i for i in ids if i[0] in states]
+        return sorted(ids)
+
+    depth = HIERARCHY.index(level)
+    parents = parent_ids(client, year, dataset, HIERARCHY[depth - 1], states)
+    required = REQUIRED_PARENTS[level]
+    # Only ask for the parents the API needs, one request per distinct set.
+    queries = sorted({p[:len(required)] for p in parents})
+    results = client.get_many([
+        (year, dataset, "NAME", level + ":*", in_predicate(required, q)) for q in queries
+    ])
+    n = depth + 1
+    ids = {tuple(row[-n:]) for rows in results for row in rows[1:]}
+    if states is not None:
+        ids = {i for i in ids if i[0] in states}
+    return sorted(ids)
+
+
+def in_predicate(levels, ids):
+    """Build an `in` predicate such as "state:13 county:001"."""
+    return " ".join("{}:{}".format(level, i) for level, i in zip(levels, ids)) or None
+
+
+def plan_requests(client, year, dataset, level, states=None):
+    """The `in` predicates needed to cover every geography of level.
+
+    Fetches the parent IDs first, so asking for block groups in a state
+    becomes one request per county.
+    """
+    required = REQUIRED_PARENTS[level]
+    if not required:
+        if level == "state" or states is None:
+            return [None]
+        return [in_predicate(["state"], [s]) for s in sorted(states)]
+    parents = parent_ids(client, year, dataset, required[-1], states)
+    return [in_predicate(required, p) for p in parents]
+
+
+def fan_out(client, year, dataset, variables, level, out_dir, states=None,
+            max_workers=None):
+    """Fetch variables for every geography of level into a Parquet dataset.
+
+    Every child request (one per `in` predicate and chunk of at most
+    MAX_VARIABLES variables) runs in one shared thread pool of max_workers
+    threads, never more than the client's max_workers, so the number of
+    requests in flight stays within the client's connection pool. Once all
+    the chunks of an `in` predicate have arrived its result is written to
+    out_dir/state=XX/<in predicate>.parquet, so the whole extract never has
+    to sit in memory. Read it back with read_extract.
+    Every file gets the same column types, taken from the dataset's
+    variable metadata rather than from the values, so a county where a
+    variable is all missing cannot change the type of that column in the
+    dataset. (Variables missing from the metadata, possible only with
+    validation turned off, keep the type parse_column gives them.)
+    Returns the list of files written.
+    """
+    if isinstance(variables, str):
+        variables = client.table_variables(year, dataset, variables)
+    types = client.index(year, dataset).predicate_types(year, dataset, variables)
+    dtypes = {name: PREDICATE_DTYPES.get(types[name], "string") for name in variables if name in types}
+    plan = plan_requests(client, year, dataset, level, states)
+    chunks = chunk_variables(variables)
+    for_ = level + ":*"
+    if client.validate_requests:
+        for in_ in plan:
+            for chunk in chunks:
+                client.validate(year, dataset, chunk, for_, in_)
+    workers = min(max_workers or client.max_workers, client.max_workers)
+    pending = {in_: [None] * len(chunks) for in_ in plan}
+    written = []
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(client.get, year, dataset, chunk, for_, in_): (in_, k)
+            for in_ in plan for k, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            in_, k = futures[future]
+            results = pending[in_]
+            results[k] = future.result()
+            if any(rows is None for rows in results):
+                continue
+            del pending[in_]
+            df = client.wide_frame(chunks, results, for_)
+            df = df.astype({name: dtypes.get(name, "string") for name in df.columns
+                            if name != "state" and (name in dtypes or name not in variables)})
+            for state, part in df.groupby("state", sort=False):
+                directory = os.path.join(out_dir, "state={}".format(state))
+                os.makedirs(directory, exist_ok=True)
+                name = (in_ or "all").replace(" ", "_").replace(":", "-")
+                path = os.path.join(directory, name + ".parquet")
+                table = pa.Table.from_pandas(part.drop(columns="state"), preserve_index=False)
+                pq.write_table(table, path)
+                written.append(path)
+    return written
+
+
+def read_extract(out_dir, columns=None, filter=None):
+    """Read a fan_out dataset back as a DataFrame, keeping state FIPS as strings."""
+    partitioning = ds.partitioning(pa.schema([("state", pa.string())]), flavor="hive")
+    dataset = ds.dataset(out_dir, format="parquet", partitioning=partitioning)
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
@@ -0,0 +1,276 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from census_client import CACHE_DIR, HOST, CensusAPIError
+
+# Entries of variables.json that are predicates, not variables to get.
+PSEUDO_VARIABLES = {"for", "in", "ucgid"}
+
+# "state:13 county:001" -> [("state", "13"), ("county", "001")]; level names
+# may contain spaces ("county subdivision", "block group").
+PREDICATE = re.compile(r"\s*([^:]+?)\s*:\s*(\S+)")
+
+
+class CensusRequestError(CensusAPIError):
+    """A request that the dataset's metadata says cannot succeed, caught before sending it."""
+
+
+def parse_predicate(text):
+    """[(level, ids), ...] for a for/in predicate such as "state:13 county:001"."""
+    if not text:
+        return []
+    return PREDICATE.findall(text.replace("+", " "))
+
+
+def label_name(label):
+    """Column name from a variable label.
+
+    "Estimate!!Total:!!Has a computer:" -> "Total - Has a computer"
+    """
+    parts = [p.strip().rstrip(":") for p in label.split("!!")]
+    if len(parts) > 1 and parts[0] == "Estimate":
+        parts = parts[1:]
+    return " - ".join(p for p in parts if p)
+
+
+class MetadataIndex:
+    """Searchable local copy of variables.json and geography.json.
+
+    Metadata is downloaded once per (year, dataset) into a single sqlite
+    file: one row per variable (name, label, concept, table) with an FTS5
+    full-text index over them, and one row per geography level with the
+    parents it requires. Lookups, searches and request validation then run
+    locally. Rows are stored per API host, so metadata from a test server
+    never answers for the real API.
+    """
+
+    def __init__(self, path=None, host=HOST):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "metadata.sqlite")
+        self.host = host
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS datasets (host TEXT, year TEXT, dataset TEXT, fetched REAL, "
+            "PRIMARY KEY (host, year, dataset));"
+            "CREATE TABLE IF NOT EXISTS variables (host TEXT, year TEXT, dataset TEXT, name TEXT, "
+            "label TEXT, concept TEXT, table_id TEXT, predicate_type TEXT);"
+            "CREATE UNIQUE INDEX IF NOT EXISTS variables_name ON variables (host, year, dataset, name);"
+            "CREATE INDEX IF NOT EXISTS variables_table ON variables (host, year, dataset, table_id);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS variables_text USING fts5("
+            "name, label, concept, content='variables', content_rowid='rowid');"
+            "CREATE TABLE IF NOT EXISTS geographies (host TEXT, year TEXT, dataset TEXT, name TEXT, "
+            "level TEXT, requires TEXT, wildcard TEXT, optional TEXT, "
+            "PRIMARY KEY (host, year, dataset, name));")
+        self._db.commit()
+
+    def has(self, year, dataset):
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM datasets WHERE host = ? AND year = ? AND dataset = ?",
+                                   (self.host, str(year), dataset)).fetchone()
+        return row is not None
+
+    def ensure(self, client, year, dataset):
+        """Download and index the metadata of (year, dataset) unless it is already here."""
+        with self._lock:
+            if not self.has(year, dataset):
+                self.load(year, dataset, client.metadata_json(year, dataset, "variables.json"),
+                          client.metadata_json(year, dataset, "geography.json"))
+
+    def load(self, year, dataset, variables, geography):
+        """Index parsed variables.json and geography.json, replacing what was there."""
+        year = str(year)
+        rows = [(self.host, year, dataset, name, v.get("label", ""), v.get("concept", ""),
+                 v.get("group", "N/A"), v.get("predicateType", ""))
+                for name, v in variables["variables"].items() if name not in PSEUDO_VARIABLES]
+        levels = [(self.host, year, dataset, g["name"], g.get("geoLevelDisplay", g.get("geoLevelId", "")),
+                   json.dumps(g.get("requires", [])), json.dumps(g.get("wildcard", [])),
+                   g.get("optionalWithWCFor"))
+                  for g in geography.get("fips", [])]
+        with self._lock:
+            self.drop(year, dataset, commit=False)
+            self._db.executemany("INSERT INTO variables VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT INTO variables_text (rowid, name, label, concept) "
+                             "SELECT rowid, name, label, concept FROM variables "
+                             "WHERE host = ? AND year = ? AND dataset = ?", (self.host, year, dataset))
+            self._db.executemany("INSERT INTO geographies VALUES (?, ?, ?, ?, ?, ?, ?, ?)", levels)
+            self._db.execute("INSERT INTO datasets VALUES (?, ?, ?, ?)",
+                             (self.host, year, dataset, time.time()))
+            self._db.commit()
+
+    def drop(self, year, dataset, commit=True):
+        """Forget (year, dataset), e.g. to download its metadata again."""
+        year = str(year)
+        with self._lock:
+            self._db.execute("INSERT INTO variables_text (variables_text, rowid, name, label, concept) "
+                             "SELECT 'delete', rowid, name, label, concept FROM variables "
+                             "WHERE host = ? AND year = ? AND dataset = ?", (self.host, year, dataset))
+            for table in ("variables", "geographies", "datasets"):
+                self._db.execute("DELETE FROM {} WHERE host = ? AND year = ? AND dataset = ?".format(table),
+                                 (self.host, year, dataset))
+            if commit:
+                self._db.commit()
+
+    def _frame(self, sql, params):
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=["name", "label", "concept", "table"])
+
+    def search(self, year, dataset, text, limit=20):
+        """Variables whose name, label or concept contain every word of text, best matches first.
+
+        Words match as prefixes, so "broadband sub" finds "Broadband such as
+        cable" and "B2800" finds the B28003 variables.
+        """
+        words = re.findall(r"\w+", text)
+        if not words:
+            return self._frame("SELECT name, label, concept, table_id FROM variables WHERE 0", ())
+        query = " ".join('"{}"*'.format(w) for w in words)
+        return self._frame(
+            "SELECT v.name, v.label, v.concept, v.table_id FROM variables_text "
+            "JOIN variables v ON v.rowid = variables_text.rowid "
+            "WHERE variables_text MATCH ? AND v.host = ? AND v.year = ? AND v.dataset = ? "
+            "ORDER BY bm25(variables_text) LIMIT ?", (query, self.host, str(year), dataset, limit))
+
+    def prefix(self, year, dataset, prefix, limit=None):
+        """Variables whose name starts with prefix, in name order."""
+        return self._frame(
+            "SELECT name, label, concept, table_id FROM variables "
+            "WHERE host = ? AND year = ? AND dataset = ? AND name >= ? AND name < ? ORDER BY name LIMIT ?",
+            (self.host, str(year), dataset, prefix, prefix + "\U0010ffff", -1 if limit is None else limit))
+
+    def variables(self, year, dataset, names):
+        """{name: (label, concept, table)} for the names that exist."""
+        names = list(names)
+        found = {}
+        with self._lock:
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                rows = self._db.execute(
+                    "SELECT name, label, concept, table_id FROM variables WHERE host = ? AND year = ? AND dataset = ? "
+                    "AND name IN ({})".format(",".join("?" * len(chunk))),
+                    [self.host, str(year), dataset] + chunk).fetchall()
+                found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def predicate_types(self, year, dataset, names):
+        """{name: predicateType} ("int", "float", "string", ...) for the names that exist."""
+        names = list(names)
+        found = {}
+        with self._lock:
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                found.update(self._db.execute(
+                    "SELECT name, predicate_type FROM variables WHERE host = ? AND year = ? AND dataset = ? "
+                    "AND name IN ({})".format(",".join("?" * len(chunk))),
+                    [self.host, str(year), dataset] + chunk).fetchall())
+        return found
+
+    def table_variables(self, year, dataset, table):
+        """Variables of a table in order, estimates only where the table has them.
+
+        B28003 -> B28003_001E ... B28003_006E for the ACS; tables without
+        estimate/margin pairs (dec/sf1 P005 -> P005001 ...) keep every variable.
+        """
+        with self._lock:
+            names = [row[0] for row in self._db.execute(
+                "SELECT name FROM variables WHERE host = ? AND year = ? AND dataset = ? AND table_id = ? ORDER BY name",
+                (self.host, str(year), dataset, table))]
+        estimates = [n for n in names if n.endswith("E")]
+        return estimates or names
+
+    def labels(self, year, dataset, names):
+        """{name: descriptive column name} built from the variable labels.
+
+        Names without a label (or that would repeat another column's name)
+        keep their variable name.
+        """
+        found = self.variables(year, dataset, names)
+        result, used = {}, set()
+        for name in names:
+            label = label_name(found[name][0]) if name in found else ""
+            if not label or label in used:
+                label = name
+            used.add(label)
+            result[name] = label
+        return result
+
+    def geography(self, year, dataset, name):
+        """(summary level, required parents, wildcard parents, optional parent) or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT level, requires, wildcard, optional FROM geographies "
+                "WHERE host = ? AND year = ? AND dataset = ? AND name = ?",
+                (self.host, str(year), dataset, name)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), json.loads(row[2]), row[3]
+
+    def geographies(self, year, dataset):
+        with self._lock:
+            rows = self._db.execute("SELECT name, level, requires FROM geographies "
+                                    "WHERE host = ? AND year = ? AND dataset = ? ORDER BY level, name",
+                                    (self.host, str(year), dataset)).fetchall()
+        return pd.DataFrame([(n, l, json.loads(r)) for n, l, r in rows],
+                            columns=["name", "level", "requires"])
+
+    def validate(self, year, dataset, get, for_, in_=None):
+        """Raise CensusRequestError if the request cannot succeed; the index must be loaded.
+
+        Checks that every variable exists (group(<table>) included), that
+        the for level exists, and that in names only parents of that level
+        and every parent it requires. As geography.json allows, the
+        optionalWithWCFor parent may be left out when for is a wildcard
+        (county:* without a state, tract:* in a whole state), and only the
+        wildcard parents may be given as *.
+        """
+        if isinstance(get, str):
+            get = get.split(",")
+        groups = [g[6:-1] for g in get if g.startswith("group(") and g.endswith(")")]
+        names = [g for g in get if not (g.startswith("group(") and g.endswith(")"))]
+        found = self.variables(year, dataset, names)
+        unknown = [n for n in names if n not in found]
+        unknown += ["group({})".format(t) for t in groups if not self.table_variables(year, dataset, t)]
+        if unknown:
+            hints = []
+            for name in unknown[:5]:
+                close = self.prefix(year, dataset, name.split("_")[0], limit=3)["name"].tolist()
+                if close:
+                    hints.append("{} (did you mean {}?)".format(name, ", ".join(close)))
+                else:
+                    hints.append(name)
+            raise CensusRequestError("unknown variables for {} {}: {}".format(year, dataset, "; ".join(hints)))
+
+        target = parse_predicate(for_)
+        if len(target) != 1:
+            raise CensusRequestError("for must name one geography level, not {!r}".format(for_))
+        level, ids = target[0]
+        geography = self.geography(year, dataset, level)
+        if geography is None:
+            known = ", ".join(self.geographies(year, dataset)["name"])
+            raise CensusRequestError("{} {} has no geography {!r}; available: {}".format(
+                year, dataset, level, known))
+        _, requires, wildcard, optional = geography
+
+        parents = dict(parse_predicate(in_))
+        extra = [p for p in parents if p not in requires]
+        if extra:
+            raise CensusRequestError("{} cannot be requested in {}; its parents are {}".format(
+                level, ", ".join(extra), requires or "none"))
+        missing = [p for p in requires if p not in parents and not (p == optional and ids == "*")]
+        if missing:
+            raise CensusRequestError("{} must be requested within {}".format(
+                level, " ".join(p + ":<id>" for p in requires if p != optional or ids != "*")))
+        for parent, value in parents.items():
+            if value == "*" and parent not in wildcard:
+                raise CensusRequestError("{} cannot be requested in {}:*".format(level, parent))
+
+    def close(self):
+        self._db.close()
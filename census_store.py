@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from census_geography import HIERARCHY
+
+STORE_DIR = "census_store"
+
+
+class CensusStore:
+    """Local columnar store of Census extracts.
+
+    Tables are Parquet files laid out as
+        <root>/<year>/<dataset>/<level>/state=<FIPS>/part-0.parquet
+    so reading one state only opens that state's files, only the requested
+    columns are decoded, and rows are sorted by geography so a county filter
+    can skip row groups using the Parquet statistics. Row groups are small
+    (row_group_size rows) for that reason: a state's block groups (about 25k
+    rows for California, a few hundred per county) span many row groups, so
+    a county's rows sit in one or two of them. Files are memory mapped
+    rather than read into buffers.
+    """
+
+    def __init__(self, root=STORE_DIR, row_group_size=1024):
+        self.root = root
+        self.row_group_size = row_group_size
+        self.filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+
+    def path(self, year, dataset, level):
+        return os.path.join(self.root, str(year), dataset.replace("/", "-"),
+                            level.replace(" ", "_"))
+
+    def has(self, year, dataset, level, state=None):
+        path = self.path(year, dataset, level)
+        if state is not None:
+            path = os.path.join(path, "state={}".format(state))
+        return os.path.isdir(path) and bool(os.listdir(path))
+
+    def write(self, df, year, dataset, level):
+        """Store df, which must have a string `state` FIPS column.
+
+        Existing partitions for the states in df are replaced.
+        """
+        geo = [c for c in HIERARCHY if c in df.columns]
+        df = df.sort_values(geo, kind="stable")
+        for state, part in df.groupby("state", sort=False):
+            directory = os.path.join(self.path(year, dataset, level), "state={}".format(state))
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(part.drop(columns="state"), preserve_index=False)
+            pq.write_table(table, os.path.join(directory, "part-0.parquet"),
+                           row_group_size=self.row_group_size)
+
+    def dataset(self, year, dataset, level):
+        partitioning = ds.partitioning(pa.schema([("state", pa.string())]), flavor="hive")
+        return ds.dataset(self.path(year, dataset, level), format="parquet",
+                          partitioning=partitioning, filesystem=self.filesystem)
+
+    def read(self, year, dataset, level, columns=None, states=None, counties=None):
+        """Read a stored table as a DataFrame.
+
+        columns limits the columns decoded, states prunes whole partitions and
+        counties (3-digit FIPS) is pushed down to the Parquet reader.
+        """
+        if not self.has(year, dataset, level):
+            raise FileNotFoundError("no {} {} {} extract in {}".format(year, dataset, level, self.root))
+        condition = None
+        if states is not None:
+            condition = ds.field("state").isin([str(s) for s in states])
+        if counties is not None:
+            by_county = ds.field("county").isin([str(c) for c in counties])
+            condition = by_county if condition is None else condition & by_county
+        table = self.dataset(year, dataset, level).to_table(columns=columns, filter=condition)
+        return table.to_pandas()
+
+    def fetch(self, client, year, dataset, variables, level, states, columns=None):
+        """Read from the store, fetching and storing any missing states first.
+
+        client is a census_client.CensusClient; states are 2-digit FIPS codes.
+        """
+        for state in states:
+            if not self.has(year, dataset, level, state):
+                df = client.fetch_wide(year, dataset, variables, level + ":*",
+                                       "state:{}".format(state), columns=columns)
+                self.write(df, year, dataset, level)
+        return self.read(year, dataset, level, states=states)
+
+    def import_pickle(self, path, year, dataset, level):
+        """Move a pickled DataFrame (like ga_county.pickle) into the store."""
+        self.write(pd.read_pickle(path), year, dataset, level)
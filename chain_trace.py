@@ -0,0 +1,252 @@
+import json
+import os
+import zlib
+
+import numpy as np
+
+from grid_mcmc import WalkResult, metropolis_stepper, state_dtype
+
+# One record of index.bin per compressed chunk of trace.bin: where the chunk
+# lives in the file, the step of its first state, how many states it holds
+# and the first state itself (the rest are stored as differences).
+RECORD = np.dtype([("offset", "<i8"), ("nbytes", "<i8"), ("step", "<i8"),
+                   ("count", "<i8"), ("first", "<i8")])
+
+
+def delta_dtype(n):
+    """Smallest signed integer type that holds the difference of two node ids 0..n-1."""
+    return np.min_scalar_type(-max(n - 1, 1))
+
+
+def encode_chunk(block, dtype):
+    """zlib-compressed differences of consecutive states (the first difference is 0)."""
+    block = np.asarray(block, dtype=np.int64)
+    deltas = np.diff(block, prepend=block[:1]).astype(dtype)
+    return zlib.compress(deltas.tobytes(), 1)
+
+
+def decode_chunk(payload, first, dtype, out_dtype):
+    deltas = np.frombuffer(zlib.decompress(payload), dtype=dtype)
+    states = np.cumsum(deltas, dtype=np.int64)
+    states += first
+    return states.astype(out_dtype)
+
+
+class TraceWriter:
+    """Append-only trace of one chain's states in directory path.
+
+    trace.bin holds the compressed chunks back to back and index.bin one
+    RECORD per chunk. A chunk's record is written only after its data, so
+    a crash can leave unindexed bytes at the end of trace.bin but never a
+    record pointing at missing data; truncate() cuts both files back to a
+    chunk boundary.
+    """
+
+    def __init__(self, path, n):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["n"] != n:
+                raise ValueError("trace at {} has {} nodes, not {}".format(path, meta["n"], n))
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"n": n}, f)
+        self.dtype = delta_dtype(n)
+        self._data = open(os.path.join(path, "trace.bin"), "ab")
+        self._index = open(os.path.join(path, "index.bin"), "ab")
+        records = _read_index(path)
+        self.steps = int(records["step"][-1] + records["count"][-1]) if len(records) else 0
+        self._offset = int(records["offset"][-1] + records["nbytes"][-1]) if len(records) else 0
+        self._index.truncate(len(records) * RECORD.itemsize)
+        self._data.truncate(self._offset)
+
+    def append(self, block):
+        """Add the states of block as one chunk."""
+        if not len(block):
+            return
+        payload = encode_chunk(block, self.dtype)
+        self._data.write(payload)
+        self._data.flush()
+        record = np.array([(self._offset, len(payload), self.steps, len(block), int(block[0]))], dtype=RECORD)
+        self._index.write(record.tobytes())
+        self._offset += len(payload)
+        self.steps += len(block)
+
+    def flush(self):
+        """Push everything written so far to disk."""
+        for f in (self._data, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def truncate(self, steps):
+        """Drop every chunk after the first steps states; steps must fall on a chunk boundary."""
+        records = _read_index(self.path)
+        ends = records["step"] + records["count"]
+        keep = int(np.searchsorted(ends, steps, side="right"))
+        if steps != (ends[keep - 1] if keep else 0):
+            raise ValueError("step {} is not a chunk boundary of the trace".format(steps))
+        self._index.truncate(keep * RECORD.itemsize)
+        self._offset = int(records["offset"][keep - 1] + records["nbytes"][keep - 1]) if keep else 0
+        self._data.truncate(self._offset)
+        self.steps = steps
+        self.flush()
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+
+def _read_index(path):
+    index_path = os.path.join(path, "index.bin")
+    if not os.path.exists(index_path):
+        return np.empty(0, dtype=RECORD)
+    records = np.fromfile(index_path, dtype=np.uint8)
+    whole = len(records) // RECORD.itemsize * RECORD.itemsize
+    return records[:whole].view(RECORD)
+
+
+class Trace:
+    """Read-only view of a trace written by TraceWriter.
+
+    trace.bin is memory-mapped and chunks are decompressed only when they
+    are indexed, so t[10**8:10**8 + 1000] touches one or two chunks of a
+    long chain. len(t) is the number of recorded states and t[i] the state
+    at the start of step i, as in WalkResult.states.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.n = json.load(f)["n"]
+        self.dtype = delta_dtype(self.n)
+        self.state_dtype = state_dtype(self.n)
+        self.records = _read_index(path)
+        data_path = os.path.join(path, "trace.bin")
+        if len(self.records) and os.path.getsize(data_path):
+            self._data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        else:
+            self._data = np.empty(0, dtype=np.uint8)
+        ends = self.records["step"] + self.records["count"]
+        self.starts = np.append(self.records["step"], ends[-1] if len(ends) else 0)
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def chunk(self, k):
+        """States of chunk k as an array."""
+        r = self.records[k]
+        payload = self._data[r["offset"]:r["offset"] + r["nbytes"]]
+        return decode_chunk(payload.tobytes(), int(r["first"]), self.dtype, self.state_dtype)
+
+    def chunks(self):
+        for k in range(len(self.records)):
+            yield self.chunk(k)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, stride = key.indices(len(self))
+            if stride != 1:
+                return self[start:stop][::stride]
+            if stop <= start:
+                return np.empty(0, dtype=self.state_dtype)
+            first = int(np.searchsorted(self.starts, start, side="right")) - 1
+            last = int(np.searchsorted(self.starts, stop, side="left"))
+            parts = np.concatenate([self.chunk(k) for k in range(first, last)])
+            offset = int(self.starts[first])
+            return parts[start - offset:stop - offset]
+        i = range(len(self))[key]
+        k = int(np.searchsorted(self.starts, i, side="right")) - 1
+        return self.chunk(k)[i - int(self.starts[k])]
+
+    def __iter__(self):
+        for block in self.chunks():
+            yield from block.tolist()
+
+    def to_array(self):
+        return self[:]
+
+    def visits(self):
+        """Per-node visit counts over the whole trace, one chunk at a time."""
+        visits = np.zeros(self.n, dtype=np.int64)
+        for block in self.chunks():
+            visits += np.bincount(block, minlength=self.n)
+        return visits
+
+
+def save_checkpoint(path, step, state, visits, rng):
+    """Atomically replace path/checkpoint.npz with the chain's position after step steps."""
+    target = os.path.join(path, "checkpoint.npz")
+    partial = target + ".part"
+    with open(partial, "wb") as f:
+        np.savez(f, step=step, state=state, visits=visits,
+                 rng=json.dumps(rng.bit_generator.state))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, target)
+
+
+def load_checkpoint(path):
+    """(step, state, visits, rng state) from the latest checkpoint, or None."""
+    target = os.path.join(path, "checkpoint.npz")
+    if not os.path.exists(target):
+        return None
+    with np.load(target) as f:
+        return int(f["step"]), int(f["state"]), f["visits"].copy(), json.loads(str(f["rng"]))
+
+
+def run_chain(path, indptr, indices, weights, start, steps, seed=None,
+              chunk_size=2**16, checkpoint_every=2**20):
+    """metropolis_hastings with its trace on disk in directory path, resumable.
+
+    Every chunk_size steps the block of states is appended to the trace;
+    at least every checkpoint_every steps (and at the end) the trace is
+    flushed and the step count, current state, visit counts and the state
+    of the numpy RNG are saved. Calling run_chain again with the same
+    arguments after an interruption resumes from the latest checkpoint and
+    produces exactly the trace an uninterrupted run would have, since the
+    stepper draws the same random numbers for the same blocks. Returns a
+    WalkResult whose states is the Trace.
+    """
+    n = len(indptr) - 1
+    os.makedirs(path, exist_ok=True)
+    settings = {"n": n, "chunk_size": chunk_size, "start": int(start)}
+    settings_path = os.path.join(path, "run.json")
+    if os.path.exists(settings_path):
+        with open(settings_path) as f:
+            saved = json.load(f)
+        if saved != settings:
+            raise ValueError("{} holds a run with settings {}, not {}".format(path, saved, settings))
+    else:
+        with open(settings_path, "w") as f:
+            json.dump(settings, f)
+
+    rng = np.random.default_rng(seed)
+    checkpoint = load_checkpoint(path)
+    if checkpoint is None:
+        done, state, visits = 0, int(start), np.zeros(n, dtype=np.int64)
+    else:
+        done, state, visits, rng_state = checkpoint
+        rng.bit_generator.state = rng_state
+
+    writer = TraceWriter(path, n)
+    try:
+        writer.truncate(done)
+        advance = metropolis_stepper(indptr, indices, weights, rng=rng, chunk_size=chunk_size)
+        since = 0
+        while done < steps:
+            m = min(chunk_size, steps - done)
+            block, state = advance(state, m)
+            writer.append(block)
+            visits += np.bincount(block, minlength=n)
+            done += m
+            since += m
+            if since >= checkpoint_every or done == steps:
+                writer.flush()
+                save_checkpoint(path, done, state, visits, rng)
+                since = 0
+    finally:
+        writer.close()
+    return WalkResult(visits, Trace(path), state)
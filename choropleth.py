@@ -0,0 +1,217 @@
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import shapely
+from matplotlib.collections import PathCollection
+from matplotlib.colors import BoundaryNorm, Normalize
+from matplotlib.path import Path
+
+
+def geometry_paths(geometries):
+    """One matplotlib Path per geometry (polygons with holes, multipolygons).
+
+    All the coordinates are pulled out in one call and cut into paths, so
+    no Python loop runs over rings or vertices.
+    """
+    geometries = np.asarray(geometries)
+    parts, part_of = shapely.get_parts(geometries, return_index=True)
+    rings, ring_of = shapely.get_rings(parts, return_index=True)
+    coords, vertex_of = shapely.get_coordinates(rings, return_index=True)
+
+    codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    if len(coords):
+        starts = np.flatnonzero(np.r_[True, vertex_of[1:] != vertex_of[:-1]])
+        codes[starts] = Path.MOVETO
+        codes[np.r_[starts[1:], len(coords)] - 1] = Path.CLOSEPOLY
+
+    geometry_of = part_of[ring_of[vertex_of]]
+    cuts = np.searchsorted(geometry_of, np.arange(1, len(geometries)))
+    return [Path(v, c) if len(v) else Path(np.empty((0, 2))) for v, c in
+            zip(np.split(coords, cuts), np.split(codes, cuts))]
+
+
+def _sort_categories(values):
+    try:
+        return sorted(values)
+    except TypeError:
+        return sorted(values, key=str)
+
+
+def assignment_series(partition):
+    """A partition's assignment as a Series indexed by the original node ids.
+
+    gerrychain 1.0 Partitions key the assignment by internal node ids;
+    they are mapped back to the ids of the graph the partition was built
+    from (the GeoDataFrame index for a graph made from a frame).
+    """
+    assignment = dict(partition.assignment)
+    graph = partition.graph
+    if hasattr(graph, "original_nx_node_id_for_internal_node_id"):
+        assignment = {graph.original_nx_node_id_for_internal_node_id(node): part
+                      for node, part in assignment.items()}
+    return pd.Series(assignment)
+
+
+class ChoroplethMap:
+    """Choropleth plots of one set of polygons, redrawn cheaply.
+
+    The polygons are simplified once per zoom level with
+    shapely.coverage_simplify, which simplifies every shared boundary the
+    same way on both sides, so neighboring units never gap or overlap.
+    Level 0 is the original geometry and every later level doubles the
+    tolerance, starting from min_tolerance (a fraction of the width of the
+    map). Paths are built once per level and kept, and a plot keeps its
+    PathCollection, so plotting another column or a new assignment only
+    changes the face colors; zooming swaps in the paths of the coarsest
+    level that is still finer than pixel_tolerance screen pixels.
+    """
+
+    def __init__(self, gdf, levels=6, min_tolerance=1e-4, pixel_tolerance=0.5):
+        self.data = gdf
+        self.index = gdf.index
+        self.crs = gdf.crs
+        self.geometry = np.asarray(gdf.geometry.values)
+        xmin, ymin, xmax, ymax = shapely.total_bounds(self.geometry)
+        self.bounds = (xmin, ymin, xmax, ymax)
+        width = max(xmax - xmin, ymax - ymin)
+        self.tolerances = [0.0] + [width * min_tolerance * 2 ** k for k in range(levels - 1)]
+        self.pixel_tolerance = pixel_tolerance
+        self._geometries = {0: self.geometry}
+        self._paths = {}
+
+    def simplified(self, level):
+        """Geometries at a zoom level, simplified on first use."""
+        if level not in self._geometries:
+            self._geometries[level] = shapely.coverage_simplify(self.geometry, self.tolerances[level])
+        return self._geometries[level]
+
+    def paths(self, level):
+        if level not in self._paths:
+            self._paths[level] = geometry_paths(self.simplified(level))
+        return self._paths[level]
+
+    def level_for(self, ax):
+        """Coarsest level whose tolerance is below pixel_tolerance pixels of ax."""
+        x0, x1 = ax.get_xlim()
+        y0, y1 = ax.get_ylim()
+        bbox = ax.get_window_extent()
+        per_pixel = min(abs(x1 - x0) / max(bbox.width, 1), abs(y1 - y0) / max(bbox.height, 1))
+        fine = [level for level, t in enumerate(self.tolerances) if t <= per_pixel * self.pixel_tolerance]
+        return fine[-1]
+
+    def values(self, column):
+        """Values per unit in index order from a column name, Series, array or partition."""
+        if isinstance(column, str):
+            return self.data[column].to_numpy()
+        if hasattr(column, "assignment"):
+            column = assignment_series(column)
+        if isinstance(column, pd.Series):
+            return column.reindex(self.index).to_numpy()
+        return np.asarray(column)
+
+    def plot(self, column=None, ax=None, cmap=None, categorical=None, figsize=(10, 10),
+             edgecolor="face", linewidth=0.1, vmin=None, vmax=None):
+        """Draw the units, colored by column if given; returns a ChoroplethPlot.
+
+        column is a column of the GeoDataFrame, a Series indexed like the
+        units, an array in unit order or a gerrychain Partition (colored by
+        assignment). Assignments and non-numeric values are treated as
+        categories, as in GeoDataFrame.plot.
+        """
+        if ax is None:
+            _, ax = plt.subplots(figsize=figsize)
+        xmin, ymin, xmax, ymax = self.bounds
+        ax.set_xlim(xmin, xmax)
+        ax.set_ylim(ymin, ymax)
+        ax.set_aspect("equal")
+        figure = ChoroplethPlot(self, ax, edgecolor, linewidth)
+        if column is not None:
+            figure.recolor(column, cmap=cmap, categorical=categorical, vmin=vmin, vmax=vmax)
+        return figure
+
+
+class ChoroplethPlot:
+    """One drawn ChoroplethMap: a PathCollection on an axes that follows zooming."""
+
+    def __init__(self, choropleth, ax, edgecolor, linewidth):
+        self.map = choropleth
+        self.ax = ax
+        self.level = choropleth.level_for(ax)
+        self.collection = PathCollection(choropleth.paths(self.level), edgecolor=edgecolor,
+                                         linewidth=linewidth, transform=ax.transData)
+        ax.add_collection(self.collection, autolim=False)
+        ax.callbacks.connect("xlim_changed", self._zoomed)
+        ax.callbacks.connect("ylim_changed", self._zoomed)
+        self.categories = None
+
+    def _zoomed(self, ax):
+        level = self.map.level_for(ax)
+        if level != self.level:
+            self.level = level
+            self.collection.set_paths(self.map.paths(level))
+
+    def recolor(self, column, cmap=None, categorical=None, vmin=None, vmax=None):
+        """Color the units by a new column or assignment, keeping the paths."""
+        values = self.map.values(column)
+        if categorical is None:
+            categorical = hasattr(column, "assignment") or not np.issubdtype(values.dtype, np.number)
+        if categorical:
+            present = pd.isna(values)
+            self.categories = np.asarray(_sort_categories(set(values[~present].tolist())), dtype=object)
+            codes = np.full(len(values), np.nan)
+            lookup = {value: i for i, value in enumerate(self.categories.tolist())}
+            codes[~present] = [lookup[v] for v in values[~present].tolist()]
+            k = max(len(self.categories), 1)
+            norm = BoundaryNorm(np.arange(k + 1) - 0.5, k)
+            values = codes
+        else:
+            self.categories = None
+            values = values.astype(float)
+            norm = Normalize(np.nanmin(values) if vmin is None else vmin,
+                             np.nanmax(values) if vmax is None else vmax)
+        cmap = plt.get_cmap(cmap if cmap is not None else ("tab20" if categorical else None))
+        if categorical:
+            cmap = cmap.resampled(len(norm.boundaries) - 1)
+        self.collection.set_cmap(cmap)
+        self.collection.set_norm(norm)
+        self.collection.set_array(np.ma.masked_invalid(values))
+        self.ax.figure.canvas.draw_idle()
+        return self
+
+
+def benchmark(gdf, columns, repeat=3):
+    """Seconds per figure for GeoDataFrame.plot, the one-time cost of a
+    ChoroplethMap, and seconds per figure for recoloring it."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for column in columns:
+            ax = gdf.plot(column=column)
+            ax.figure.canvas.draw()
+            plt.close(ax.figure)
+    plain = (time.perf_counter() - t) / (repeat * len(columns))
+
+    t = time.perf_counter()
+    figure = ChoroplethMap(gdf).plot()
+    setup = time.perf_counter() - t
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for column in columns:
+            figure.recolor(column)
+            figure.ax.figure.canvas.draw()
+    cached = (time.perf_counter() - t) / (repeat * len(columns))
+    plt.close(figure.ax.figure)
+    return plain, setup, cached
+
+
+if __name__ == "__main__":
+    import geopandas
+
+    df = geopandas.read_file("https://github.com/mggg-states/PA-shapefiles/raw/master/PA/PA_VTD.zip")
+    plain, setup, cached = benchmark(df, ["TOTPOP", "2011_PLA_1"])
+    print("GeoDataFrame.plot: {:.2f}s per figure".format(plain))
+    print("ChoroplethMap: {:.2f}s once, then {:.2f}s per figure".format(setup, cached))
@@ -0,0 +1,114 @@
+import time
+
+import networkx as nx
+
+
+def _bfs(graph, nodes, source):
+    """Distances from source within the node set, as a list of BFS levels."""
+    levels = [[source]]
+    seen = {source}
+    while True:
+        frontier = []
+        for node in levels[-1]:
+            for neighbor in graph.neighbors(node):
+                if neighbor in nodes and neighbor not in seen:
+                    seen.add(neighbor)
+                    frontier.append(neighbor)
+        if not frontier:
+            break
+        levels.append(frontier)
+    if len(seen) != len(nodes):
+        raise nx.NetworkXError("Found infinite path length because the graph is not connected")
+    return levels
+
+
+def double_sweep(graph, nodes, start=None):
+    """Bounds (lower, upper) on the diameter of the subgraph on nodes.
+
+    Two BFS runs: one from start (the highest-degree node by default) to
+    find a far node, and one from that far node. The second eccentricity is
+    a lower bound; twice the first is an upper bound.
+    """
+    nodes = set(nodes)
+    if start is None:
+        start = max(nodes, key=lambda n: sum(1 for m in graph.neighbors(n) if m in nodes))
+    first = _bfs(graph, nodes, start)
+    second = _bfs(graph, nodes, first[-1][0])
+    return len(second) - 1, 2 * (len(first) - 1)
+
+
+def exact_diameter(graph, nodes):
+    """Exact diameter of the subgraph on nodes with iFUB.
+
+    Start from the middle of a double-sweep path and examine the BFS levels
+    from the outside in, running a BFS only from the nodes on the current
+    level; it stops as soon as the lower and upper bounds meet, which for
+    district-shaped subgraphs takes a handful of BFS runs instead of one per
+    node (networkx.diameter).
+    """
+    nodes = set(nodes)
+    if len(nodes) == 1:
+        return 0
+    start = max(nodes, key=lambda n: sum(1 for m in graph.neighbors(n) if m in nodes))
+    a = _bfs(graph, nodes, start)[-1][0]
+    sweep = _bfs(graph, nodes, a)
+    middle = _midpoint(graph, nodes, sweep, sweep[-1][0])
+
+    levels = _bfs(graph, nodes, middle)
+    i = len(levels) - 1
+    lower = max(i, len(sweep) - 1)
+    upper = 2 * i
+    while upper > lower:
+        farthest = max(len(_bfs(graph, nodes, node)) - 1 for node in levels[i])
+        lower = max(lower, farthest)
+        if lower > 2 * (i - 1):
+            return lower
+        upper = 2 * (i - 1)
+        i -= 1
+    return lower
+
+
+def _midpoint(graph, nodes, sweep, end):
+    """Node halfway along a shortest path from the sweep's source to end."""
+    depth = {node: d for d, level in enumerate(sweep) for node in level}
+    node = end
+    for _ in range(depth[end] // 2):
+        node = next(m for m in graph.neighbors(node) if m in nodes and depth.get(m) == depth[node] - 1)
+    return node
+
+
+def district_diameters(name="diameters", exact=True):
+    """Updater mapping each part to its diameter.
+
+    With exact=False the values are (lower, upper) bounds from double_sweep.
+    Values are reused from the parent partition for every part whose
+    membership did not change, so in a chain only the parts touched by the
+    flip are recomputed.
+    """
+    compute = exact_diameter if exact else double_sweep
+
+    def updater(partition):
+        parent = partition.parent
+        if parent is None:
+            return {part: compute(partition.graph, nodes) for part, nodes in partition.parts.items()}
+        changed = {parent.assignment[node] for node in partition.flips}
+        changed.update(partition.flips.values())
+        values = dict(parent[name])
+        for part in changed:
+            nodes = partition.parts.get(part)
+            if nodes:
+                values[part] = compute(partition.graph, nodes)
+            else:
+                values.pop(part, None)
+        return values
+
+    return updater
+
+
+if __name__ == "__main__":
+    g = nx.grid_graph([40, 25])
+    g.remove_nodes_from([(x, y) for x in range(5, 35) for y in range(8, 12)])
+    for function in (nx.diameter, lambda h: exact_diameter(h, h.nodes), lambda h: double_sweep(h, h.nodes)):
+        t = time.perf_counter()
+        value = function(g)
+        print(value, "{:.4f}s".format(time.perf_counter() - t))
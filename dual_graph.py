@@ -0,0 +1,184 @@
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import shapely
+
+# Per-worker state: every geometry of the frame being turned into a graph.
+_worker = {}
+
+
+def _init_worker(wkb):
+    _worker["geometries"] = shapely.from_wkb(wkb)
+
+
+def _intersect_batch(left, right):
+    """(shared length, empty?, overlapping?) for the pairs (left[k], right[k])."""
+    geometries = _worker["geometries"]
+    shared = shapely.intersection(geometries[left], geometries[right])
+    return shapely.length(shared), shapely.is_empty(shared), shapely.area(shared) > 0
+
+
+def candidate_pairs(geometries):
+    """Pairs (i, j), i < j, of positions whose geometries intersect, from one STRtree query."""
+    tree = shapely.STRtree(geometries)
+    left, right = tree.query(geometries, predicate="intersects")
+    keep = left < right
+    return left[keep], right[keep]
+
+
+class DualGraph:
+    """Adjacency of a GeoDataFrame's polygons in CSR form.
+
+    Node i is row i of the frame (label index[i]); its neighbors are
+    indices[indptr[i]:indptr[i + 1]], in increasing order, and shared_perim
+    holds the shared boundary length for each of those slots. data is a
+    DataFrame indexed like the frame with the node attributes, one column
+    each: area, boundary_node, boundary_perim and the requested columns.
+    geometry is the frame's geometry column.
+    """
+
+    def __init__(self, index, indptr, indices, shared_perim, data, crs=None, geometry=None):
+        self.index = index
+        self.indptr = indptr
+        self.indices = indices
+        self.shared_perim = shared_perim
+        self.data = data
+        self.crs = crs
+        self.geometry = geometry
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, i):
+        """Positions of the neighbors of the node at position i."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def edges(self):
+        """Arrays (u, v, shared_perim) of positions with u < v, one entry per edge."""
+        rows = np.repeat(np.arange(len(self)), self.degree)
+        keep = rows < self.indices
+        return rows[keep], self.indices[keep], self.shared_perim[keep]
+
+    def to_networkx(self):
+        """networkx Graph with the same nodes, edges and attributes as Graph.from_geodataframe."""
+        g = nx.Graph()
+        labels = self.index.tolist()
+        columns = list(self.data.columns)
+        for label, values in zip(labels, self.data.itertuples(index=False, name=None)):
+            attributes = dict(zip(columns, values))
+            if not attributes.get("boundary_node", True):
+                attributes.pop("boundary_perim", None)
+            g.add_node(label, **attributes)
+        u, v, perim = self.edges()
+        g.add_edges_from((labels[a], labels[b], {"shared_perim": p})
+                         for a, b, p in zip(u.tolist(), v.tolist(), perim.tolist()))
+        if self.crs is not None:
+            g.graph["crs"] = self.crs.to_json()
+        return g
+
+    def to_graph(self):
+        """A gerrychain Graph, as Graph.from_geodataframe(df) plus graph.add_data(df) would return it."""
+        from gerrychain import Graph
+
+        graph = Graph.from_networkx(self.to_networkx())
+        graph.geometry = self.geometry
+        graph.data = self.data.drop(columns=["area", "boundary_node", "boundary_perim"])
+        return graph
+
+
+def dual_graph(df, adjacency="rook", columns=None, processes=None, batch_size=20000):
+    """DualGraph of the polygons in df, with the edges of Graph.from_geodataframe(df, adjacency).
+
+    Candidate neighbors come from a single STRtree query; the shared
+    boundaries of the candidates are computed in batches of batch_size
+    pairs across a process pool. Rook adjacency keeps pairs whose shared
+    boundary has positive length, queen adjacency every pair that touches.
+    columns (all of df's columns by default) are copied into data as node
+    attributes.
+    """
+    if adjacency not in ("rook", "queen"):
+        raise ValueError('adjacency must be "rook" or "queen", not {!r}'.format(adjacency))
+    geometries = np.asarray(df.geometry.values)
+    n = len(geometries)
+    left, right = candidate_pairs(geometries)
+
+    length = np.empty(len(left))
+    empty = np.empty(len(left), dtype=bool)
+    overlap = np.empty(len(left), dtype=bool)
+    if len(left):
+        with ProcessPoolExecutor(processes or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(shapely.to_wkb(geometries),)) as pool:
+            futures = [(start, pool.submit(_intersect_batch, left[start:start + batch_size],
+                                           right[start:start + batch_size]))
+                       for start in range(0, len(left), batch_size)]
+            for start, future in futures:
+                stop = start + batch_size
+                length[start:stop], empty[start:stop], overlap[start:stop] = future.result()
+
+    if overlap.any():
+        labels = df.index
+        warnings.warn("Found overlaps among the given polygons. Indices of overlaps: {}".format(
+            {(labels[i], labels[j]) for i, j in zip(left[overlap], right[overlap])}))
+    keep = length > 0 if adjacency == "rook" else ~empty
+    left, right, length = left[keep], right[keep], length[keep]
+
+    # Both directions of every edge, sorted by row and then column.
+    rows = np.concatenate([left, right])
+    cols = np.concatenate([right, left])
+    perim = np.concatenate([length, length])
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    indices = cols[order].astype(np.int64)
+    shared_perim = perim[order]
+
+    # Exterior perimeter of the nodes on the outer boundary, as in
+    # gerrychain's add_boundary_perimeters.
+    boundaries = shapely.boundary(geometries)
+    outline = shapely.boundary(shapely.union_all(geometries))
+    shapely.prepare(outline)
+    boundary_node = shapely.intersects(outline, boundaries)
+    shared_total = np.bincount(rows, weights=perim, minlength=n)
+    boundary_perim = np.where(boundary_node, shapely.length(boundaries) - shared_total, np.nan)
+
+    data = pd.DataFrame({"area": shapely.area(geometries), "boundary_node": boundary_node,
+                         "boundary_perim": boundary_perim}, index=df.index)
+    columns = list(df.columns) if columns is None else list(columns)
+    data = pd.concat([data, pd.DataFrame(df[columns])], axis=1)
+    return DualGraph(df.index, indptr, indices, shared_perim, data, crs=df.crs, geometry=df.geometry)
+
+
+def benchmark(df, adjacency="rook", processes=None):
+    """Time dual_graph against Graph.from_geodataframe on df and check the edge sets agree."""
+    from gerrychain import Graph
+
+    t = time.perf_counter()
+    built = dual_graph(df, adjacency, processes=processes)
+    fast = time.perf_counter() - t
+    t = time.perf_counter()
+    reference = Graph.from_geodataframe(df, adjacency=adjacency)
+    slow = time.perf_counter() - t
+
+    labels = df.index
+    u, v, _ = built.edges()
+    edges = {frozenset((labels[a], labels[b])) for a, b in zip(u, v)}
+    assert edges == {frozenset(edge) for edge in reference.edges}
+    return fast, slow
+
+
+if __name__ == "__main__":
+    import geopandas
+
+    df = geopandas.read_file("https://github.com/mggg-states/PA-shapefiles/raw/master/PA/PA_VTD.zip")
+    df.set_index("GEOID10", inplace=True)
+    fast, slow = benchmark(df)
+    print("dual_graph: {:.2f}s, Graph.from_geodataframe: {:.2f}s".format(fast, slow))
@@ -0,0 +1,125 @@
+import hashlib
+import weakref
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+# Digits in each FIPS component, by the column names used in the Census API
+# results and in the boundary files.
+FIPS_WIDTHS = {
+    "state": 2, "statefp": 2,
+    "county": 3, "countyfp": 3,
+    "tract": 6, "tractce": 6,
+    "block group": 1, "block_group": 1, "blkgrpce": 1,
+    "block": 4, "blockce": 4,
+}
+
+# Packed keys and their sort order per table, so repeated joins against the
+# same table do not rebuild them. Entries are checked against a digest of the
+# key columns and go away with the table.
+_key_cache = {}
+
+
+def pack_geoid(df, columns):
+    """Pack FIPS component columns (or one GEOID column) into int64 keys.
+
+    ["state", "county"] with values "13", "001" becomes 13001, the same
+    number as the GEOID "13001"; missing or non-numeric values become -1.
+    """
+    if isinstance(columns, str):
+        columns = [columns]
+    key = np.zeros(len(df), dtype=np.int64)
+    bad = np.zeros(len(df), dtype=bool)
+    for name in columns:
+        values = df[name]
+        width = FIPS_WIDTHS.get(name.lower())
+        if width is None:
+            width = int(values.astype(str).str.len().max()) if len(values) else 0
+        numbers = pd.to_numeric(values, errors="coerce")
+        bad |= numbers.isna().to_numpy()
+        key = key * 10 ** width + numbers.fillna(0).to_numpy(dtype=np.int64)
+    key[bad] = -1
+    return key
+
+
+def _fingerprint(df, columns):
+    """Digest of the values in the key columns; changes with any edit to them."""
+    hashes = pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy()
+    return hashlib.sha1(np.ascontiguousarray(hashes).tobytes()).hexdigest()
+
+
+def key_index(df, columns):
+    """Cached (keys, order) for df: packed keys and their argsort.
+
+    The cache is keyed on the table and validated against a hash of the key
+    columns, which is several times cheaper than packing them, so keys edited
+    in place (df["county"] = ..., df.loc[...] = ...) are packed again rather
+    than served stale.
+    """
+    columns = (columns,) if isinstance(columns, str) else tuple(columns)
+    fingerprint = _fingerprint(df, columns)
+    entry = _key_cache.get(id(df))
+    if entry is not None and entry[0]() is df:
+        cached = entry[1]
+        hit = cached.get(columns)
+        if hit is not None and hit[0] == fingerprint:
+            return hit[1]
+    else:
+        cached = {}
+    keys = pack_geoid(df, columns)
+    index = (keys, np.argsort(keys, kind="stable"))
+    cached[columns] = (fingerprint, index)
+    ident = id(df)
+    _key_cache[ident] = (weakref.ref(df, lambda _: _key_cache.pop(ident, None)), cached)
+    return index
+
+
+def clear_key_cache():
+    """Forget every cached key index."""
+    _key_cache.clear()
+
+
+def geoid_join(left, right, on=None, left_on=None, right_on=None, suffix="_right"):
+    """Left join right onto left by packed FIPS/GEOID keys.
+
+    Every row of left is kept, in order, and gets the matching row of right
+    (right keys must be unique). The result is always a GeoDataFrame with
+    the CRS preserved, whichever side the geometry was on, so the
+    "GeoDataFrame must be on the left" rule from join_intro.py no longer
+    matters. When left holds the geometry it is shared, not copied.
+    """
+    left_on = left_on or on
+    right_on = right_on or on
+    left_keys = key_index(left, left_on)[0]
+    right_keys, order = key_index(right, right_on)
+
+    sorted_keys = right_keys[order]
+    # Missing and non-numeric keys are all -1 and never match, so only the
+    # valid keys have to be unique.
+    valid = sorted_keys[sorted_keys >= 0]
+    if len(valid) > 1 and (np.diff(valid) == 0).any():
+        raise ValueError("right table has duplicate keys")
+    pos = np.searchsorted(sorted_keys, left_keys)
+    pos = np.minimum(pos, max(len(sorted_keys) - 1, 0))
+    found = (len(sorted_keys) > 0) & (left_keys >= 0)
+    if len(sorted_keys):
+        found &= sorted_keys[pos] == left_keys
+    indexer = np.where(found, order[pos] if len(order) else -1, -1)
+
+    if isinstance(left, gpd.GeoDataFrame):
+        out = left.copy(deep=False)
+        geometry, crs = left.geometry.name, left.crs
+    elif isinstance(right, gpd.GeoDataFrame):
+        out = pd.DataFrame(left, copy=False)
+        geometry, crs = right.geometry.name, right.crs
+    else:
+        raise TypeError("neither table has a geometry column")
+
+    skip = {right_on} if isinstance(right_on, str) else set(right_on)
+    for name in right.columns:
+        if name in skip:
+            continue
+        values = pd.api.extensions.take(right[name].array, indexer, allow_fill=True)
+        out[name + suffix if name in out.columns else name] = values
+    return gpd.GeoDataFrame(out, geometry=geometry, crs=crs)
@@ -0,0 +1,181 @@
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+from gerrychain import Graph
+from networkx.readwrite import json_graph
+
+from graph_repair import nx_graph
+
+# Python types stored as native Arrow columns. Columns with mixed types,
+# missing keys, None values or nested values are stored as JSON text instead
+# (Arrow null meaning "no such attribute"), which keeps round trips exact.
+NATIVE = {bool: pa.bool_(), int: pa.int64(), float: pa.float64(), str: pa.string()}
+
+
+class _Missing:
+    pass
+
+
+_MISSING = _Missing()
+
+
+def _column(values):
+    """(Arrow array, is_json) for attribute values, with _MISSING for absent keys."""
+    kinds = {type(v) for v in values}
+    if len(kinds) == 1 and next(iter(kinds)) in NATIVE:
+        kind = next(iter(kinds))
+        try:
+            return pa.array(values, type=NATIVE[kind]), False
+        except (pa.ArrowInvalid, OverflowError):
+            pass
+    return pa.array([None if v is _MISSING else json.dumps(v) for v in values], type=pa.string()), True
+
+
+def _table(records):
+    """Arrow table with one column per attribute key across records."""
+    keys = []
+    for record in records:
+        for key in record:
+            if key not in keys:
+                keys.append(key)
+    arrays, names, encoded = [], [], []
+    for key in keys:
+        array, is_json = _column([record.get(key, _MISSING) for record in records])
+        arrays.append(array)
+        names.append(key)
+        if is_json:
+            encoded.append(key)
+    schema = pa.schema([pa.field(n, a.type) for n, a in zip(names, arrays)],
+                       metadata={"json_columns": json.dumps(encoded)})
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_table(table, path):
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def json_to_binary(json_path, path):
+    """Convert a Graph.to_json file to the binary format without building a graph."""
+    with open(json_path) as f:
+        data = json.load(f)
+    write_adjacency_data(data, path)
+
+
+def save_binary(graph, path):
+    """Write a gerrychain Graph (or networkx graph) in the binary format."""
+    write_adjacency_data(json_graph.adjacency_data(nx_graph(graph)), path)
+
+
+def write_adjacency_data(data, path):
+    """Write networkx adjacency data (the Graph.to_json structure) to directory path.
+
+    Layout: indptr.npy and indices.npy (CSR adjacency in file order),
+    nodes.arrow (node ids and attributes, one column each), edges.arrow
+    (edge attributes per CSR slot) and meta.json.
+    """
+    os.makedirs(path, exist_ok=True)
+    nodes = data["nodes"]
+    position = {_hashable(node["id"]): i for i, node in enumerate(nodes)}
+    degree = np.array([len(adj) for adj in data["adjacency"]], dtype=np.int64)
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    indices = np.array([position[_hashable(e["id"])] for adj in data["adjacency"] for e in adj],
+                       dtype=np.int64)
+    np.save(os.path.join(path, "indptr.npy"), indptr)
+    np.save(os.path.join(path, "indices.npy"), indices)
+
+    _write_table(_table(nodes), os.path.join(path, "nodes.arrow"))
+    edges = [{k: v for k, v in e.items() if k != "id"} for adj in data["adjacency"] for e in adj]
+    _write_table(_table(edges), os.path.join(path, "edges.arrow"))
+    meta = {key: data[key] for key in ("directed", "multigraph", "graph")}
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def _hashable(value):
+    # JSON ids are usually ints or strings, but lists are valid too.
+    return tuple(_hashable(v) for v in value) if isinstance(value, list) else value
+
+
+class BinaryGraph:
+    """A graph in the binary format, opened without parsing anything.
+
+    indptr and indices are memory-mapped NumPy arrays, and node and edge
+    attributes are memory-mapped Arrow tables, so only the columns that are
+    actually used get read from disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        self.indices = np.load(os.path.join(path, "indices.npy"), mmap_mode="r")
+        self.node_table = self._open("nodes.arrow")
+        self.edge_table = self._open("edges.arrow")
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+    def _open(self, name):
+        return pa.ipc.open_file(pa.memory_map(os.path.join(self.path, name))).read_all()
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @staticmethod
+    def _decode(table, name):
+        encoded = json.loads(table.schema.metadata[b"json_columns"])
+        values = table.column(name).to_pylist()
+        if name in encoded:
+            return [_MISSING if v is None else json.loads(v) for v in values]
+        return values
+
+    def node_ids(self):
+        return self._decode(self.node_table, "id")
+
+    def column(self, name):
+        """One node attribute as an Arrow array, in node order, without copying.
+
+        JSON-encoded columns come back as their JSON text.
+        """
+        return self.node_table.column(name)
+
+    def neighbors(self, i):
+        """Positions of the neighbors of the node at position i."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def adjacency_data(self):
+        """The networkx adjacency data this graph was written from."""
+        nodes = [{} for _ in range(len(self))]
+        for name in self.node_table.column_names:
+            for record, value in zip(nodes, self._decode(self.node_table, name)):
+                if value is not _MISSING:
+                    record[name] = value
+        ids = [node["id"] for node in nodes]
+        edges = [{} for _ in range(len(self.indices))]
+        for name in self.edge_table.column_names:
+            for record, value in zip(edges, self._decode(self.edge_table, name)):
+                if value is not _MISSING:
+                    record[name] = value
+        indices = self.indices.tolist()
+        indptr = self.indptr.tolist()
+        adjacency = [[dict(edges[s], id=ids[indices[s]]) for s in range(indptr[i], indptr[i + 1])]
+                     for i in range(len(self))]
+        return dict(self.meta, nodes=nodes, adjacency=adjacency)
+
+    def to_networkx(self):
+        return json_graph.adjacency_graph(self.adjacency_data())
+
+    def to_graph(self):
+        """A gerrychain Graph, as Graph.from_json would return it."""
+        return Graph.from_networkx(self.to_networkx())
+
+    def to_json(self, json_path):
+        with open(json_path, "w") as f:
+            json.dump(self.adjacency_data(), f)
+
+
+def load_binary(path):
+    return BinaryGraph(path)
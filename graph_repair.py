@@ -0,0 +1,287 @@
+import warnings
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import shapely
+from gerrychain import Graph
+
+
+def nx_graph(graph):
+    """The networkx graph behind a gerrychain Graph (or the graph itself).
+
+    Older gerrychain Graphs are networkx Graphs; newer ones wrap one.
+    """
+    return graph.get_nx_graph() if hasattr(graph, "get_nx_graph") else graph
+
+
+class GeoidIndex:
+    """Bidirectional GEOID <-> node index for a dual graph.
+
+    Replaces the linear find_node_by_geoid scan from
+    IslandsAndConnectivity.ipynb: the index is built once, and nodes added or
+    removed through the index keep it up to date.
+    """
+
+    def __init__(self, graph, column="GEOID10", tracker=None):
+        self.graph = graph
+        self.column = column
+        # Edits go through the ComponentTracker when there is one, so both
+        # stay in step with the graph.
+        self.editor = tracker if tracker is not None else nx_graph(graph)
+        self.node_for = {}
+        self.geoid_for = {}
+        for node, data in nx_graph(graph).nodes(data=True):
+            self._insert(node, data[column])
+
+    @classmethod
+    def from_json(cls, path, column="GEOID10"):
+        """Load a graph with Graph.from_json and index it."""
+        return cls(Graph.from_json(path), column)
+
+    def _check(self, node, geoid):
+        if geoid in self.node_for and self.node_for[geoid] != node:
+            raise ValueError("GEOID {} is on nodes {} and {}".format(geoid, self.node_for[geoid], node))
+
+    def _insert(self, node, geoid):
+        self._check(node, geoid)
+        self.node_for[geoid] = node
+        self.geoid_for[node] = geoid
+
+    def __len__(self):
+        return len(self.node_for)
+
+    def __contains__(self, geoid):
+        return geoid in self.node_for
+
+    def node(self, geoid):
+        return self.node_for[geoid]
+
+    def geoid(self, node):
+        return self.geoid_for[node]
+
+    def nodes(self, geoids):
+        """Nodes for many GEOIDs, raising one KeyError that lists every unknown GEOID."""
+        missing = [g for g in geoids if g not in self.node_for]
+        if missing:
+            raise KeyError("unknown GEOIDs: {}".format(", ".join(map(str, missing))))
+        return [self.node_for[g] for g in geoids]
+
+    def add_node(self, node, **attrs):
+        """Add a node to the graph; attrs must include the GEOID column.
+
+        A GEOID already on another node raises ValueError before the graph
+        is touched.
+        """
+        self._check(node, attrs[self.column])
+        self.editor.add_node(node, **attrs)
+        self._insert(node, attrs[self.column])
+
+    def remove_node(self, node):
+        self.editor.remove_node(node)
+        del self.node_for[self.geoid_for.pop(node)]
+
+    def remove_nodes_from(self, nodes):
+        for node in list(nodes):
+            self.remove_node(node)
+
+    def add_edges_from_geoids(self, pairs):
+        """Add an edge for every (GEOID, GEOID) pair; returns the node pairs.
+
+        Every GEOID is checked before any edge is added.
+        """
+        pairs = list(pairs)
+        us = self.nodes([u for u, v in pairs])
+        vs = self.nodes([v for u, v in pairs])
+        edges = list(zip(us, vs))
+        self.editor.add_edges_from(edges)
+        return edges
+
+
+class ComponentTracker:
+    """Connected components of a graph, kept up to date while it is edited.
+
+    Every node carries a component label and every label its member set.
+    Adding an edge merges the smaller component into the larger one, so
+    patching islands never recomputes connected_components; removing a node
+    or an edge re-traverses only the component it was in.
+    Edit the graph through the tracker (add_edge, remove_node, ...).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.label = {}
+        self.members = {}
+        self._next_label = 0
+        g = nx_graph(graph)
+        for node in g:
+            if node not in self.label:
+                self._relabel(self._reachable(node, None))
+
+    def _reachable(self, start, allowed):
+        g = nx_graph(self.graph)
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            for neighbor in g[queue.popleft()]:
+                if neighbor not in seen and (allowed is None or neighbor in allowed):
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        return seen
+
+    def _relabel(self, nodes):
+        label = self._next_label
+        self._next_label += 1
+        for node in nodes:
+            self.label[node] = label
+        self.members[label] = set(nodes)
+
+    def _split(self, label):
+        """Re-traverse one component after something was removed from it."""
+        remaining = self.members.pop(label)
+        while remaining:
+            part = self._reachable(next(iter(remaining)), remaining)
+            self._relabel(part)
+            remaining -= part
+
+    def add_node(self, node, **attrs):
+        nx_graph(self.graph).add_node(node, **attrs)
+        if node not in self.label:
+            self._relabel([node])
+
+    def add_edge(self, u, v, **attrs):
+        for node in (u, v):
+            if node not in self.label:
+                self._relabel([node])
+        nx_graph(self.graph).add_edge(u, v, **attrs)
+        a, b = self.label[u], self.label[v]
+        if a == b:
+            return
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        for node in self.members[b]:
+            self.label[node] = a
+        self.members[a] |= self.members.pop(b)
+
+    def add_edges_from(self, edges):
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def remove_edge(self, u, v):
+        nx_graph(self.graph).remove_edge(u, v)
+        if v not in self._reachable(u, self.members[self.label[u]]):
+            self._split(self.label[u])
+
+    def remove_node(self, node):
+        nx_graph(self.graph).remove_node(node)
+        label = self.label.pop(node)
+        self.members[label].discard(node)
+        self._split(label)
+
+    def remove_nodes_from(self, nodes):
+        """Remove many nodes, re-traversing each affected component once."""
+        affected = set()
+        for node in list(nodes):
+            nx_graph(self.graph).remove_node(node)
+            label = self.label.pop(node)
+            self.members[label].discard(node)
+            affected.add(label)
+        for label in affected:
+            self._split(label)
+
+    def components(self):
+        """Member sets, largest first."""
+        return sorted(self.members.values(), key=len, reverse=True)
+
+    def sizes(self):
+        return sorted((len(m) for m in self.members.values()), reverse=True)
+
+    def component_of(self, node):
+        return self.members[self.label[node]]
+
+    def problem_components(self):
+        """Every component except the largest, like problem_components in the notebook."""
+        return self.components()[1:]
+
+    def is_connected(self):
+        return len(self.members) == 1
+
+    def summary(self):
+        return "{} components, sizes {}".format(len(self.members), self.sizes())
+
+
+def bridge_islands(graph, units, column="GEOID10", k=1, index=None, tracker=None):
+    """Connect every component of graph to the largest one with new edges.
+
+    units is the GeoDataFrame the graph was built from, with the GEOID
+    column shared with the graph; use a projected CRS so distances mean
+    something. One STRtree is built over the mainland units; each outlying
+    component is linked to its k nearest mainland units (each by the
+    shortest link from any unit of the component), which is the hand search
+    for geoids_i_found in IslandsAndConnectivity.ipynb done for the whole
+    graph at once. A component gets fewer than k edges, with a warning, only
+    when the mainland has fewer than k units.
+
+    Returns a report DataFrame with one row per added edge, keyed by the
+    GEOIDs of both ends.
+    """
+    tracker = tracker if tracker is not None else ComponentTracker(graph)
+    index = index if index is not None else GeoidIndex(graph, column, tracker=tracker)
+    columns = ["component", "component_size", "geoid", "mainland_geoid", "distance"]
+    components = tracker.components()
+    if len(components) <= 1:
+        return pd.DataFrame(columns=columns)
+
+    geometry = pd.Series(units.geometry.values, index=units[column].values)
+    mainland = [index.geoid(node) for node in components[0]]
+    outlying = [(c, index.geoid(node)) for c, nodes in enumerate(components[1:], 1) for node in nodes]
+    tree = shapely.STRtree(geometry.loc[mainland].values)
+    group = np.array([c for c, g in outlying])
+    source, target, distance = _k_nearest(tree, geometry.loc[[g for c, g in outlying]].values, group, k)
+
+    links = pd.DataFrame({
+        "component": [outlying[i][0] for i in source],
+        "geoid": [outlying[i][1] for i in source],
+        "mainland_geoid": [mainland[j] for j in target],
+        "distance": distance,
+    })
+    links["component_size"] = links["component"].map(lambda c: len(components[c]))
+    links = links.sort_values(["component", "distance"], kind="stable")
+    links = links.drop_duplicates(["component", "mainland_geoid"])
+    report = links.groupby("component", sort=True).head(k)[columns].reset_index(drop=True)
+    short = report["component"].value_counts().loc[lambda n: n < k]
+    if len(short):
+        warnings.warn("the mainland has only {} units; components {} get fewer than k={} edges".format(
+            len(mainland), sorted(short.index.tolist()), k))
+
+    index.add_edges_from_geoids(zip(report["geoid"], report["mainland_geoid"]))
+    return report
+
+
+def _k_nearest(tree, geometries, group, k):
+    """(query index, tree index, distance) pairs covering the k nearest tree
+    geometries of each group of geometries (group[i] is the group of
+    geometries[i]).
+
+    The nearest distance of a group seeds its search radius, which doubles
+    until k distinct tree geometries lie within it (or the tree runs out);
+    every pair within the final radius is returned.
+    """
+    nearest, distance = tree.query_nearest(geometries, return_distance=True, all_matches=False)
+    seed = pd.Series(distance).groupby(group[nearest[0]]).min()
+    tree_geometries = tree.geometries
+    xmin, ymin, xmax, ymax = shapely.total_bounds(np.concatenate([tree_geometries, geometries]))
+    step = max(np.hypot(xmax - xmin, ymax - ymin), 1.0) / 1024
+    want = min(k, len(tree_geometries))
+    sources, targets = [], []
+    for g, radius in seed.items():
+        members = np.flatnonzero(group == g)
+        while True:
+            source, target = tree.query(geometries[members], predicate="dwithin", distance=radius)
+            if len(np.unique(target)) >= want:
+                break
+            radius = max(2 * radius, step)
+        sources.append(members[source])
+        targets.append(target)
+    source, target = np.concatenate(sources), np.concatenate(targets)
+    return source, target, shapely.distance(geometries[source], tree_geometries[target])
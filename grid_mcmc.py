@@ -0,0 +1,126 @@
+import collections
+
+import numpy as np
+import networkx as nx
+
+# Result of a chain run: per-node visit counts, the optional trace of states
+# (the state at the start of every step, like the `states` list in
+# mcmc_grid_walk.py) and the state the chain ended in.
+WalkResult = collections.namedtuple("WalkResult", ["visits", "states", "state"])
+
+
+def csr_adjacency(g):
+    """Return (nodes, indptr, indices, degree) for the graph g.
+
+    Node i of the chain is nodes[i]; its neighbors are
+    indices[indptr[i]:indptr[i+1]].
+    """
+    nodes = list(g.nodes())
+    index = {x: i for i, x in enumerate(nodes)}
+    degree = np.fromiter((g.degree(x) for x in nodes), dtype=np.int64, count=len(nodes))
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    indices = np.fromiter((index[y] for x in nodes for y in g.neighbors(x)),
+                          dtype=np.int64, count=int(indptr[-1]))
+    return nodes, indptr, indices, degree
+
+
+def state_dtype(n):
+    """Smallest unsigned integer type that can hold the node ids 0..n-1."""
+    return np.min_scalar_type(max(n - 1, 0))
+
+
+def metropolis_stepper(indptr, indices, weights, rng=None, chunk_size=2**16):
+    """Prepare the neighbor-proposal Metropolis-Hastings kernel on integer ids.
+
+    The proposal is a uniform neighbor of the current node and the proposal
+    is accepted with probability
+        (weights[proposal]/weights[state]) * (degree[state]/degree[proposal])
+    exactly as in mcmc_grid_walk.py, so the stationary distribution is
+    proportional to weights.
+
+    Returns advance(state, m) which runs m <= chunk_size steps from state and
+    returns (block, state): block holds the state at the start of each step
+    and state is where the chain ended up. Random numbers are drawn from rng
+    (a numpy Generator or a seed) into preallocated buffers, and block is one
+    of those buffers, so copy it if it has to outlive the next call.
+    """
+    rng = np.random.default_rng(rng)
+    degree = np.diff(indptr)
+
+    # alpha = h[proposal] / h[state] with h = weight / degree. A node without
+    # neighbors is never proposed, and a chain started on one stays there.
+    weights = np.asarray(weights, dtype=np.float64)
+    h = np.divide(weights, degree, out=np.zeros(len(weights)), where=degree > 0).tolist()
+    starts = indptr[:-1].tolist()
+    deg = degree.tolist()
+    nbrs = indices.tolist()
+
+    u_prop = np.empty(chunk_size)
+    u_acc = np.empty(chunk_size)
+    buffer = np.empty(chunk_size, dtype=np.int64)
+
+    def advance(state, m):
+        if m > chunk_size:
+            raise ValueError("at most {} steps per call".format(chunk_size))
+        state = int(state)
+        rng.random(out=u_prop[:m])
+        rng.random(out=u_acc[:m])
+        props = u_prop[:m].tolist()
+        accs = u_acc[:m].tolist()
+        trace = [0] * m
+        for i in range(m):
+            trace[i] = state
+            d = deg[state]
+            if d:
+                proposal = nbrs[starts[state] + int(props[i] * d)]
+                if accs[i] * h[state] < h[proposal]:
+                    state = proposal
+        block = buffer[:m]
+        block[:] = trace
+        return block, state
+
+    return advance
+
+
+def metropolis_hastings(indptr, indices, weights, start, steps, rng=None,
+                        record_states=False, chunk_size=2**16):
+    """Run metropolis_stepper for steps steps from start.
+
+    Visits are accumulated once per block of chunk_size steps rather than
+    once per step.
+    """
+    n = len(indptr) - 1
+    chunk_size = max(1, min(chunk_size, steps))
+    advance = metropolis_stepper(indptr, indices, weights, rng=rng, chunk_size=chunk_size)
+
+    visits = np.zeros(n, dtype=np.int64)
+    states = np.empty(steps, dtype=state_dtype(n)) if record_states else None
+
+    state = int(start)
+    done = 0
+    while done < steps:
+        m = min(chunk_size, steps - done)
+        block, state = advance(state, m)
+        np.add.at(visits, block, 1)
+        if states is not None:
+            states[done:done + m] = block
+        done += m
+
+    return WalkResult(visits, states, state)
+
+
+def grid_walk(dims, score, steps, start=None, rng=None, record_states=False):
+    """Run the chain on nx.grid_graph(dims) with target score(node).
+
+    Returns (nodes, result) so that result.visits[i] belongs to nodes[i].
+    """
+    rng = np.random.default_rng(rng)
+    g = nx.grid_graph(dims)
+    nodes, indptr, indices, degree = csr_adjacency(g)
+    weights = np.array([score(x) for x in nodes], dtype=np.float64)
+    if start is None:
+        start = int(rng.integers(len(nodes)))
+    result = metropolis_hastings(indptr, indices, weights, start, steps,
+                                 rng=rng, record_states=record_states)
+    return nodes, result
@@ -14,13 +14,19 @@ import geopandas as gpd
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from boundaries import BoundaryCache
+from census_store import CensusStore
+
 
 # Begin by reading in the US counties shapefile. The link is to counties generalized for 20,000,000:1 (continental) scale mapping. For geometries are from 2010, and are appropriate for use with the 2010 Decennial Census.
 
 # In[22]:
 
 
-geo = gpd.read_file("https://www2.census.gov/geo/tiger/GENZ2010/gz_2010_us_050_00_20m.zip")
+# Downloaded once from https://www2.census.gov/geo/tiger/GENZ2010/gz_2010_us_050_00_20m.zip
+# and read from the local GeoParquet copy after that.
+boundaries = BoundaryCache()
+geo = boundaries.load("cb", 2010, "county", resolution = "20m")
 
 
 # After downloading, plot the GeoDataFrame using default settings. `plt.show` is not necessary if you are running this code in Spyder. In the notebook, it prevents display of the object identifier for the matplotlib object created by the call to `geo.plot`.
@@ -37,7 +43,12 @@ plt.show()
 # In[12]:
 
 
-ga_county = pd.read_pickle("ga_county.pickle")
+# The pickle is moved into the local columnar store the first time; after
+# that only Georgia's partition is read from the store.
+store = CensusStore()
+if not store.has(2010, "dec/sf1", "county"):
+    store.import_pickle("ga_county.pickle", 2010, "dec/sf1", "county")
+ga_county = store.read(2010, "dec/sf1", "county", states = ["13"])
 ga_county.head()
 
 
@@ -202,7 +213,7 @@ plt.show()
 # In[59]:
 
 
-geo2017 = gpd.read_file("https://www2.census.gov/geo/tiger/GENZ2017/shp/cb_2017_us_county_20m.zip")
+geo2017 = boundaries.load("cb", 2017, "county", resolution = "20m")
 geo2017.head()
 
 
@@ -211,7 +222,9 @@ geo2017.head()
 # In[62]:
 
 
-ga_county_mhi = pd.read_pickle("ga_county_mhi.pickle")
+if not store.has(2017, "acs/acs5", "county"):
+    store.import_pickle("ga_county_mhi.pickle", 2017, "acs/acs5", "county")
+ga_county_mhi = store.read(2017, "acs/acs5", "county", states = ["13"])
 ga_county_mhi.head()
 
 
@@ -0,0 +1,171 @@
+import statistics
+import time
+from collections import defaultdict, deque
+
+from gerrychain.constraints.contiguity import contiguous
+
+
+def _connected_within(graph, starts, allowed, limit):
+    """Are all starts connected inside the node set allowed?
+
+    One breadth-first search grows from every start at once, expanding the
+    searches in turn; searches that touch are merged. Returns True when they
+    have all merged, False when a merged group runs out of nodes to expand
+    before meeting the rest (it is cut off), and None when more than limit
+    nodes were expanded without deciding.
+    """
+    starts = list(starts)
+    if len(starts) <= 1:
+        return True
+    group = list(range(len(starts)))
+
+    def find(i):
+        while group[i] != i:
+            group[i] = group[group[i]]
+            i = group[i]
+        return i
+
+    owner = {node: i for i, node in enumerate(starts)}
+    queues = [deque([node]) for node in starts]
+    groups = len(starts)
+    expanded = 0
+    while True:
+        active = {}
+        for i, queue in enumerate(queues):
+            if queue:
+                active.setdefault(find(i), []).append(i)
+        live = {find(i) for i in range(len(starts))}
+        if any(root not in active for root in live):
+            return False
+        for i, queue in enumerate(queues):
+            if not queue:
+                continue
+            node = queue.popleft()
+            expanded += 1
+            for neighbor in graph.neighbors(node):
+                if neighbor not in allowed:
+                    continue
+                j = owner.get(neighbor)
+                if j is None:
+                    owner[neighbor] = i
+                    queue.append(neighbor)
+                elif find(i) != find(j):
+                    group[find(j)] = find(i)
+                    groups -= 1
+                    if groups == 1:
+                        return True
+        if expanded > limit:
+            return None
+
+
+def _full_check(graph, starts, allowed):
+    """Plain traversal of allowed from one start; True if it reaches every start."""
+    starts = list(starts)
+    seen = {starts[0]}
+    queue = deque([starts[0]])
+    while queue:
+        for neighbor in graph.neighbors(queue.popleft()):
+            if neighbor in allowed and neighbor not in seen:
+                seen.add(neighbor)
+                queue.append(neighbor)
+    return all(node in seen for node in starts)
+
+
+def flip_contiguous(partition, limit=2000):
+    """Is partition contiguous, given that its parent was?
+
+    Only the parts touched by partition.flips are examined. For a part that
+    lost nodes, the remaining neighbors of those nodes must still be
+    connected to each other, which a bounded search around them usually
+    settles quickly; a full traversal of the part runs only when the search
+    hits limit. For a part that gained nodes, every new node must be
+    connected to the rest of the part.
+    """
+    graph = partition.graph
+    parent = partition.parent
+    assignment = partition.assignment
+    lost = defaultdict(set)
+    gained = defaultdict(set)
+    for node, target in partition.flips.items():
+        source = parent.assignment[node]
+        if source != target:
+            lost[source].add(node)
+            gained[target].add(node)
+
+    for part, removed in lost.items():
+        remaining = partition.parts.get(part, ())
+        if not remaining:
+            continue
+        starts = {m for node in removed for m in graph.neighbors(node)
+                  if m not in removed and assignment[m] == part}
+        answer = _connected_within(graph, starts, remaining, limit)
+        if answer is None:
+            answer = _full_check(graph, starts, remaining)
+        if not answer:
+            return False
+
+    for part, added in gained.items():
+        # Spread from the new nodes that touch the old part through the
+        # other new nodes; every new node has to be reached.
+        if len(partition.parts[part]) > len(added):
+            reached = {node for node in added
+                       if any(assignment[m] == part and m not in added for m in graph.neighbors(node))}
+        else:
+            reached = {next(iter(added))}
+        queue = deque(reached)
+        while queue:
+            for neighbor in graph.neighbors(queue.popleft()):
+                if neighbor in added and neighbor not in reached:
+                    reached.add(neighbor)
+                    queue.append(neighbor)
+        if len(reached) != len(added):
+            return False
+    return True
+
+
+def local_contiguous(partition):
+    """Contiguity constraint for chains: flip_contiguous when there is a parent,
+    gerrychain's contiguous for the initial partition."""
+    if partition.parent is None:
+        return contiguous(partition)
+    return flip_contiguous(partition)
+
+
+def benchmark(sizes=(20, 40, 80), parts=4, steps=300, seed=0):
+    """Median per-step cost of flip_contiguous and gerrychain's contiguous for growing districts.
+
+    Every answer is checked against contiguous along the way.
+    """
+    import random
+
+    import networkx as nx
+    from gerrychain import Graph, Partition
+    from gerrychain.proposals import propose_random_flip
+
+    random.seed(seed)
+    results = []
+    for size in sizes:
+        g = nx.convert_node_labels_to_integers(nx.grid_graph([size, size]), label_attribute="xy")
+        for node, data in g.nodes(data=True):
+            data["district"] = data["xy"][0] * parts // size
+        partition = Partition(Graph.from_networkx(g), "district")
+        local, full = [], []
+        for _ in range(steps):
+            proposed = propose_random_flip(partition)
+            t = time.perf_counter()
+            answer = flip_contiguous(proposed)
+            local.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            expected = contiguous(proposed)
+            full.append(time.perf_counter() - t)
+            assert answer == expected
+            if answer:
+                partition = proposed
+        results.append((size * size // parts, statistics.median(local), statistics.median(full)))
+    return results
+
+
+if __name__ == "__main__":
+    for nodes_per_district, local, full in benchmark():
+        print("{} nodes per district: local {:.2e} s/step, full {:.2e} s/step".format(
+            nodes_per_district, local, full))
@@ -0,0 +1,180 @@
+import time
+
+import numpy as np
+
+
+def node_data(graph, node):
+    """Attribute dict of node; gerrychain 1.0 Graphs index nodes by position."""
+    if hasattr(graph, "node_data"):
+        return graph.node_data(node)
+    return graph.nodes[node]
+
+
+def _sort_parts(parts):
+    try:
+        return sorted(parts)
+    except TypeError:
+        return sorted(parts, key=str)
+
+
+class PartStatistics:
+    """Per-part statistics of a partition, as flat arrays indexed by part.
+
+    parts[i] is the part label that row i of every array belongs to:
+    sizes (number of nodes), edge_counts (edges inside the part),
+    cut_counts (cut edges touching the part) and sums[column] (node
+    attribute totals, e.g. population). cut_edge_count is the number of
+    edges between different parts, len(partition.cut_edges) in
+    WorkingWithPartitions.ipynb.
+    """
+
+    def __init__(self, parts, columns):
+        self.parts = list(parts)
+        self.position = {part: i for i, part in enumerate(self.parts)}
+        k = len(self.parts)
+        self.sizes = np.zeros(k, dtype=np.int64)
+        self.edge_counts = np.zeros(k, dtype=np.int64)
+        self.cut_counts = np.zeros(k, dtype=np.int64)
+        self.cut_edge_count = 0
+        self.sums = {column: np.zeros(k) for column in columns}
+
+    @classmethod
+    def compute(cls, partition, columns):
+        """Statistics from scratch: one pass over the nodes and one over the edges."""
+        graph = partition.graph
+        assignment = partition.assignment
+        stats = cls(_sort_parts(partition.parts), columns)
+        position = stats.position
+        for node in graph.nodes:
+            i = position[assignment[node]]
+            stats.sizes[i] += 1
+            data = node_data(graph, node)
+            for column in columns:
+                stats.sums[column][i] += data[column]
+        for u, v in graph.edges:
+            stats._add_edge(assignment[u], assignment[v])
+        return stats
+
+    def copy(self):
+        other = PartStatistics.__new__(PartStatistics)
+        other.parts = self.parts
+        other.position = self.position
+        other.sizes = self.sizes.copy()
+        other.edge_counts = self.edge_counts.copy()
+        other.cut_counts = self.cut_counts.copy()
+        other.cut_edge_count = self.cut_edge_count
+        other.sums = {column: values.copy() for column, values in self.sums.items()}
+        return other
+
+    def _add_edge(self, a, b, sign=1):
+        if a == b:
+            self.edge_counts[self.position[a]] += sign
+        else:
+            self.cut_edge_count += sign
+            self.cut_counts[self.position[a]] += sign
+            self.cut_counts[self.position[b]] += sign
+
+    def apply_flips(self, partition, parent):
+        """Update in place for partition = parent.flip(partition.flips).
+
+        Only the flipped nodes and the edges at them are visited.
+        """
+        graph = partition.graph
+        old = parent.assignment
+        new = partition.assignment
+        seen = set()
+        for node, target in partition.flips.items():
+            source = old[node]
+            if source == target:
+                continue
+            i, j = self.position[source], self.position[target]
+            self.sizes[i] -= 1
+            self.sizes[j] += 1
+            data = node_data(graph, node)
+            for column, values in self.sums.items():
+                values[i] -= data[column]
+                values[j] += data[column]
+            for neighbor in graph.neighbors(node):
+                edge = frozenset((node, neighbor))
+                if edge in seen:
+                    continue
+                seen.add(edge)
+                self._add_edge(old[node], old[neighbor], -1)
+                self._add_edge(new[node], new[neighbor])
+
+    def as_dict(self, values):
+        """A per-part array as {part: value}, e.g. stats.as_dict(stats.sizes)."""
+        return dict(zip(self.parts, values.tolist()))
+
+
+def part_statistics(name="part_statistics", columns=()):
+    """Updater that keeps PartStatistics up to date along a chain.
+
+    Register it under name, e.g.
+        Partition(graph, "2011_PLA_1", {"part_statistics": part_statistics(columns=["TOTPOP"])})
+    A partition with a parent copies the parent's arrays (one entry per
+    part) and applies only the flips, so a step costs O(parts + boundary of
+    the flip) instead of a pass over every subgraph.
+    """
+    columns = list(columns)
+
+    def updater(partition):
+        parent = partition.parent
+        if parent is None:
+            return PartStatistics.compute(partition, columns)
+        stats = parent[name]
+        if any(part not in stats.position for part in partition.flips.values()):
+            return PartStatistics.compute(partition, columns)
+        stats = stats.copy()
+        stats.apply_flips(partition, parent)
+        return stats
+
+    return updater
+
+
+def recompute_like_notebook(partition, columns=()):
+    """The per-part loops of WorkingWithPartitions.ipynb, for comparison."""
+    sizes = {part: len(nodes) for part, nodes in partition.parts.items()}
+    edge_counts = {part: len(subgraph.edges) for part, subgraph in partition.subgraphs.items()}
+    sums = {column: {part: sum(node_data(partition.graph, n)[column] for n in nodes)
+                     for part, nodes in partition.parts.items()} for column in columns}
+    cut = sum(1 for u, v in partition.graph.edges if partition.assignment[u] != partition.assignment[v])
+    return sizes, edge_counts, sums, cut
+
+
+def benchmark(size=60, parts=6, steps=300, seed=0):
+    """Time the incremental updater against recompute_like_notebook along a flip chain."""
+    import random
+
+    import networkx as nx
+    from gerrychain import Graph, Partition
+    from gerrychain.proposals import propose_random_flip
+
+    random.seed(seed)
+    g = nx.convert_node_labels_to_integers(nx.grid_graph([size, size]), label_attribute="xy")
+    for node, data in g.nodes(data=True):
+        data["TOTPOP"] = 1 + data["xy"][0] % 7
+        data["district"] = data["xy"][0] * parts // size
+    partition = Partition(Graph.from_networkx(g), "district",
+                          {"part_statistics": part_statistics(columns=["TOTPOP"])})
+    partition["part_statistics"]
+
+    incremental = recompute = 0.0
+    for _ in range(steps):
+        partition = propose_random_flip(partition)
+        t = time.perf_counter()
+        stats = partition["part_statistics"]
+        incremental += time.perf_counter() - t
+        t = time.perf_counter()
+        sizes, edge_counts, sums, cut = recompute_like_notebook(partition, ["TOTPOP"])
+        recompute += time.perf_counter() - t
+        assert stats.as_dict(stats.sizes) == sizes
+        assert stats.as_dict(stats.edge_counts) == edge_counts
+        assert stats.as_dict(stats.sums["TOTPOP"]) == sums["TOTPOP"]
+        assert stats.cut_edge_count == cut
+    return incremental / steps, recompute / steps
+
+
+if __name__ == "__main__":
+    incremental, recompute = benchmark()
+    print("incremental: {:.2e} s/step, recomputed: {:.2e} s/step".format(incremental, recompute))
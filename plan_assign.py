@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from reproject import to_crs
+
+# Per-worker state: the districts of the plan being assigned and their tree.
+_worker = {}
+
+
+def _init_worker(district_wkb):
+    districts = shapely.from_wkb(district_wkb)
+    shapely.prepare(districts)
+    _worker["districts"] = districts
+    _worker["tree"] = shapely.STRtree(districts)
+
+
+def _assign_chunk(unit_wkb, points_wkb):
+    districts = _worker["districts"]
+    tree = _worker["tree"]
+    units = shapely.from_wkb(unit_wkb)
+    points = shapely.from_wkb(points_wkb)
+    result = np.full(len(units), -1, dtype=np.int64)
+
+    # Common case: the district containing a point inside the unit covers
+    # the whole unit.
+    point_idx, district_idx = tree.query(points, predicate="within")
+    candidate = np.full(len(units), -1, dtype=np.int64)
+    candidate[point_idx[::-1]] = district_idx[::-1]
+    has = np.flatnonzero(candidate >= 0)
+    covered = shapely.covered_by(units[has], districts[candidate[has]])
+    result[has[covered]] = candidate[has[covered]]
+
+    # Units that straddle a boundary go to the district with the largest
+    # overlap, as in maup.assign.
+    rest = np.flatnonzero(result < 0)
+    if len(rest):
+        unit_idx, district_idx = tree.query(units[rest], predicate="intersects")
+        if len(unit_idx):
+            area = shapely.area(shapely.intersection(units[rest][unit_idx], districts[district_idx]))
+            order = np.lexsort((-area, unit_idx))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = unit_idx[order][1:] != unit_idx[order][:-1]
+            best = order[first & (area[order] > 0)]
+            result[rest[unit_idx[best]]] = district_idx[best]
+    return result
+
+
+class UnitIndex:
+    """Units prepared once for assigning them to any number of plans.
+
+    Units are sorted along a Hilbert curve and cut into spatially compact
+    tiles, each with its geometry and an interior point already serialized,
+    so assigning a new plan only ships the districts and the tiles to the
+    worker processes.
+    """
+
+    def __init__(self, units, tile_size=5000):
+        self.index = units.index
+        self.crs = units.crs
+        order = units.geometry.hilbert_distance().to_numpy().argsort(kind="stable")
+        geometry = units.geometry.values[order]
+        points = shapely.point_on_surface(np.asarray(geometry))
+        self.tiles = []
+        for start in range(0, len(order), tile_size):
+            stop = start + tile_size
+            self.tiles.append((order[start:stop], shapely.to_wkb(np.asarray(geometry[start:stop])),
+                               shapely.to_wkb(points[start:stop])))
+
+    def assign(self, districts, processes=None):
+        """Series indexed like the units with labels from districts.index.
+
+        districts is reprojected to the units' CRS when the two differ.
+        Units that no district touches are left missing.
+        """
+        if districts.crs != self.crs:
+            districts = to_crs(districts, self.crs)
+        district_wkb = shapely.to_wkb(np.asarray(districts.geometry.values))
+        positions = np.full(len(self.index), -1, dtype=np.int64)
+        with ProcessPoolExecutor(processes or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(district_wkb,)) as pool:
+            futures = [(rows, pool.submit(_assign_chunk, unit_wkb, points_wkb))
+                       for rows, unit_wkb, points_wkb in self.tiles]
+            for rows, future in futures:
+                positions[rows] = future.result()
+
+        labels = np.full(len(positions), None, dtype=object)
+        found = positions >= 0
+        labels[found] = np.asarray(districts.index, dtype=object)[positions[found]]
+        return pd.Series(labels, index=self.index).infer_objects()
+
+
+def assign(units, districts, processes=None):
+    """One-off version of UnitIndex(units).assign(districts), like maup.assign."""
+    return UnitIndex(units).assign(districts, processes=processes)
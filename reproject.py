@@ -0,0 +1,85 @@
+import functools
+import hashlib
+import os
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import CRS, Transformer
+
+CACHE_DIR = "reprojection_cache"
+
+
+@functools.lru_cache(maxsize=64)
+def _transformer(src, dst):
+    return Transformer.from_crs(CRS.from_user_input(src), CRS.from_user_input(dst), always_xy=True)
+
+
+def transformer(src, dst):
+    """Shared pyproj Transformer from src to dst (anything pyproj accepts)."""
+    return _transformer(CRS.from_user_input(src).to_wkt(), CRS.from_user_input(dst).to_wkt())
+
+
+def reproject_geometry(geometry, src, dst):
+    """Reproject a GeoSeries or geometry array in one bulk coordinate transform."""
+    t = transformer(src, dst)
+
+    def project(coords):
+        x, y = t.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+
+    return shapely.transform(np.asarray(geometry), project)
+
+
+def to_crs(gdf, crs):
+    """gdf.to_crs(crs), but reusing the transformer between calls."""
+    if gdf.crs is None:
+        raise ValueError("cannot reproject a GeoDataFrame without a CRS")
+    if CRS.from_user_input(crs) == gdf.crs:
+        return gdf.copy(deep=False)
+    out = gdf.copy(deep=False)
+    out[gdf.geometry.name] = gpd.GeoSeries(reproject_geometry(gdf.geometry.values, gdf.crs, crs),
+                                           index=gdf.index, crs=crs)
+    return out.set_crs(crs, allow_override=True)
+
+
+class ReprojectionCache:
+    """Projected geometry columns cached in memory and on disk.
+
+    Entries are keyed by (dataset, source CRS, target CRS) and a SHA-1 digest
+    of the source geometry's WKB, so rerunning a notebook reads the projected
+    column back instead of reprojecting every coordinate again, and a
+    changed source is never matched to a stale entry.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._memory = {}
+
+    def _key(self, gdf, dataset, crs):
+        fingerprint = hashlib.sha1()
+        fingerprint.update(str(len(gdf)).encode())
+        for wkb in shapely.to_wkb(np.asarray(gdf.geometry.values)):
+            wkb = wkb or b""
+            fingerprint.update(len(wkb).to_bytes(8, "little") + wkb)
+        parts = [dataset, CRS.from_user_input(gdf.crs).to_wkt(),
+                 CRS.from_user_input(crs).to_wkt(), fingerprint.hexdigest()]
+        return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+    def to_crs(self, gdf, crs, dataset):
+        """gdf reprojected to crs, with the geometry column read from cache if possible."""
+        key = self._key(gdf, dataset, crs)
+        geometry = self._memory.get(key)
+        path = os.path.join(self.cache_dir, key + ".parquet")
+        if geometry is None and os.path.exists(path):
+            geometry = gpd.read_parquet(path).geometry.values
+        if geometry is None:
+            geometry = to_crs(gdf, crs).geometry.values
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = path + ".part"
+            gpd.GeoDataFrame(geometry=geometry, crs=crs).to_parquet(partial)
+            os.replace(partial, path)
+        self._memory[key] = geometry
+        out = gdf.copy(deep=False)
+        out[gdf.geometry.name] = gpd.GeoSeries(geometry, index=gdf.index, crs=crs)
+        return out.set_crs(crs, allow_override=True)
@@ -0,0 +1,131 @@
+import collections
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from grid_mcmc import metropolis_stepper
+
+# visits[k] is the visit histogram collected at inverse temperature betas[k];
+# the row with beta == 1 samples the target. swap_attempts[k] and
+# swap_accepts[k] count exchanges between temperatures k and k+1, and states
+# holds the final state at every temperature.
+TemperingResult = collections.namedtuple(
+    "TemperingResult", ["betas", "visits", "swap_attempts", "swap_accepts", "states"])
+
+# Shared arrays attached in each worker process, by name, and the steppers
+# the worker has built, by temperature index.
+_shared = {}
+_steppers = {}
+
+
+def _create_shared(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    return shm, view
+
+
+def _attach_shared(specs):
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _shared[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    _steppers.clear()
+
+
+def _stepper(k, beta, chunk_size):
+    """The worker's stepper for temperature k, built the first time it runs k."""
+    if k not in _steppers:
+        rng = np.random.default_rng()
+        weights = _shared["weights"][1] ** beta
+        advance = metropolis_stepper(_shared["indptr"][1], _shared["indices"][1], weights,
+                                     rng=rng, chunk_size=chunk_size)
+        _steppers[k] = (advance, rng)
+    return _steppers[k]
+
+
+def _run_replica(task):
+    k, beta, state, steps, rng_state, chunk_size = task
+    advance, rng = _stepper(k, beta, chunk_size)
+    rng.bit_generator.state = rng_state
+    # Each temperature row is written by exactly one task per round.
+    visits = _shared["visits"][1][k]
+    done = 0
+    while done < steps:
+        m = min(chunk_size, steps - done)
+        block, state = advance(state, m)
+        np.add.at(visits, block, 1)
+        done += m
+    return state, rng.bit_generator.state
+
+
+def temperature_ladder(k, beta_min=0.1):
+    """Geometric ladder of k inverse temperatures from 1 down to beta_min."""
+    if k == 1:
+        return np.ones(1)
+    return np.geomspace(1.0, beta_min, k)
+
+
+def parallel_tempering(indptr, indices, weights, starts, rounds, swap_interval,
+                       betas=None, seed=None, processes=None):
+    """Run tempered replicas of the grid_mcmc kernel across a process pool.
+
+    Replica k targets weights ** betas[k]. Every round each replica runs
+    swap_interval Metropolis-Hastings steps in a worker, then the parent
+    attempts swaps between neighboring temperatures. The adjacency, weights
+    and visit histograms live in shared memory, and each worker builds the
+    stepper for a temperature once and adds every block straight into that
+    temperature's histogram, so a round only moves each replica's state and
+    RNG state between processes.
+    """
+    if betas is None:
+        betas = temperature_ladder(len(starts))
+    betas = np.asarray(betas, dtype=np.float64)
+    k = len(betas)
+    if len(starts) != k:
+        raise ValueError("need one start state per temperature")
+    weights = np.asarray(weights, dtype=np.float64)
+    log_weights = np.log(weights)
+    seed_seq = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_seq.spawn(1)[0])
+
+    arrays = {
+        "indptr": np.asarray(indptr),
+        "indices": np.asarray(indices),
+        "weights": weights,
+        "visits": np.zeros((k, len(weights)), dtype=np.int64),
+    }
+    blocks = {}
+    try:
+        for name, array in arrays.items():
+            blocks[name] = _create_shared(array)
+        specs = {name: (shm.name, view.shape, view.dtype) for name, (shm, view) in blocks.items()}
+
+        states = [int(s) for s in starts]
+        rng_states = [np.random.default_rng(s).bit_generator.state for s in seed_seq.spawn(k)]
+        chunk_size = max(1, min(swap_interval, 2**16))
+        swap_attempts = np.zeros(max(k - 1, 0), dtype=np.int64)
+        swap_accepts = np.zeros(max(k - 1, 0), dtype=np.int64)
+        with mp.Pool(processes or min(k, os.cpu_count()), initializer=_attach_shared,
+                     initargs=(specs,)) as pool:
+            for r in range(rounds):
+                tasks = [(i, betas[i], states[i], swap_interval, rng_states[i], chunk_size)
+                         for i in range(k)]
+                states, rng_states = map(list, zip(*pool.map(_run_replica, tasks)))
+                # Alternate even and odd pairs so every pair gets a chance.
+                for i in range(r % 2, k - 1, 2):
+                    swap_attempts[i] += 1
+                    x, y = states[i], states[i + 1]
+                    log_alpha = (betas[i] - betas[i + 1]) * (log_weights[y] - log_weights[x])
+                    if np.log(rng.random()) < log_alpha:
+                        states[i], states[i + 1] = y, x
+                        swap_accepts[i] += 1
+
+        visits = blocks["visits"][1].copy()
+    finally:
+        for shm, view in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    return TemperingResult(betas, visits, swap_attempts, swap_accepts, np.array(states))
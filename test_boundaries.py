@@ -0,0 +1,57 @@
+import os
+import shutil
+import zipfile
+
+import geopandas
+import pytest
+from shapely.geometry import box
+
+from boundaries import BoundaryCache, boundary_path
+
+
+@pytest.fixture
+def host(tmp_path):
+    """Local directory laid out like the TIGER server, holding one tiny
+    cartographic boundary file: four unit-square "states" in a row."""
+    states = geopandas.GeoDataFrame(
+        {"STATEFP": ["01", "04", "05", "06"], "NAME": ["A", "B", "C", "D"]},
+        geometry=[box(i, 0, i + 1, 1) for i in range(4)], crs="EPSG:4269")
+    shp = tmp_path / "shp"
+    shp.mkdir()
+    states.to_file(shp / "cb_2017_us_state_20m.shp")
+    root = tmp_path / "tiger"
+    target = root / boundary_path("cb", 2017, "state")
+    target.parent.mkdir(parents=True)
+    with zipfile.ZipFile(target, "w") as z:
+        for name in os.listdir(shp):
+            z.write(shp / name, name)
+    return root
+
+
+def test_boundary_path():
+    assert boundary_path("cb", 2017, "state") == "GENZ2017/shp/cb_2017_us_state_20m.zip"
+    assert boundary_path("cb", 2010, "county") == "GENZ2010/gz_2010_us_050_00_20m.zip"
+    assert boundary_path("tiger", 2012, "sldu", state="25") == "TIGER2012/SLDU/tl_2012_25_sldu.zip"
+
+
+def test_first_load_converts_and_reload_uses_cache(tmp_path, host):
+    cache = BoundaryCache(str(tmp_path / "cache"), host=str(host))
+    first = cache.load("cb", 2017, "state")
+    assert sorted(first["STATEFP"]) == ["01", "04", "05", "06"]
+    assert first.crs == "EPSG:4269"
+    assert os.path.exists(os.path.join(cache.cache_dir, "parquet", "cb_2017_us_state_20m.parquet"))
+
+    # The converted copy is used from now on, without the server.
+    shutil.rmtree(host)
+    again = cache.load("cb", 2017, "state")
+    key = ["STATEFP", "NAME"]
+    assert again.sort_values("STATEFP")[key].values.tolist() == first.sort_values("STATEFP")[key].values.tolist()
+
+
+def test_states_and_bbox_filters(tmp_path, host):
+    cache = BoundaryCache(str(tmp_path / "cache"), host=str(host))
+    chosen = cache.load("cb", 2017, "state", states=["04", "06"], columns=["STATEFP"])
+    assert sorted(chosen["STATEFP"]) == ["04", "06"]
+    assert list(chosen.columns) == ["STATEFP", "geometry"]
+    inside = cache.load("cb", 2017, "state", bbox=(0.2, 0.2, 1.5, 0.8))
+    assert sorted(inside["STATEFP"]) == ["01", "04"]
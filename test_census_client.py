@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from census_client import CensusAPIError, CensusClient, ResponseCache
+from census_metadata import CensusRequestError, MetadataIndex
+
+VARIABLES = {"variables": {
+    "NAME": {"label": "Geographic Area Name", "predicateType": "string", "group": "N/A"},
+    "B19013_001E": {"label": "Estimate!!Median household income", "predicateType": "int",
+                    "group": "B19013", "concept": "MEDIAN HOUSEHOLD INCOME"},
+}}
+GEOGRAPHY = {"fips": [
+    {"name": "state", "geoLevelDisplay": "040"},
+    {"name": "county", "geoLevelDisplay": "050", "requires": ["state"], "wildcard": ["state"],
+     "optionalWithWCFor": "state"},
+]}
+
+
+class StubServer:
+    """Census API stand-in on localhost that counts data requests.
+
+    The first `failures` data requests are answered with 503.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.data_requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.endswith("variables.json"):
+                    self._send(200, VARIABLES)
+                elif url.path.endswith("geography.json"):
+                    self._send(200, GEOGRAPHY)
+                else:
+                    stub.data_requests += 1
+                    if stub.data_requests <= stub.failures:
+                        self._send(503, "try again")
+                        return
+                    get = parse_qs(url.query)["get"][0].split(",")
+                    self._send(200, [get + ["state"], ["Georgia", "52977"][:len(get)] + ["13"]])
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = "http://127.0.0.1:{}/data".format(self.server.server_port)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+def make_client(tmp_path, host, ttl=3600, **kwargs):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), ttl=ttl)
+    metadata = MetadataIndex(str(tmp_path / "metadata.sqlite"), host=host)
+    return CensusClient(host=host, cache=cache, metadata=metadata, backoff=0, **kwargs)
+
+
+def test_retries_server_errors(tmp_path):
+    server = StubServer(failures=2)
+    try:
+        client = make_client(tmp_path, server.host, retries=2)
+        rows = client.get(2017, "acs/acs5", ["NAME", "B19013_001E"], "state:13")
+        assert rows == [["NAME", "B19013_001E", "state"], ["Georgia", "52977", "13"]]
+        assert server.data_requests == 3
+    finally:
+        server.close()
+
+
+def test_gives_up_after_retries(tmp_path):
+    server = StubServer(failures=10)
+    try:
+        client = make_client(tmp_path, server.host, retries=1)
+        with pytest.raises(CensusAPIError):
+            client.get(2017, "acs/acs5", "NAME", "state:13")
+        assert server.data_requests == 2
+    finally:
+        server.close()
+
+
+def test_cache_hit_skips_request(tmp_path, stub):
+    client = make_client(tmp_path, stub.host)
+    first = client.get(2017, "acs/acs5", "NAME", "state:13")
+    second = client.get(2017, "acs/acs5", "NAME", "state:13")
+    assert first == second
+    assert stub.data_requests == 1
+
+
+def test_expired_entries_are_fetched_again(tmp_path, stub, monkeypatch):
+    client = make_client(tmp_path, stub.host, ttl=60)
+    client.get(2017, "acs/acs5", "NAME", "state:13")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    client.get(2017, "acs/acs5", "NAME", "state:13")
+    assert stub.data_requests == 2
+
+
+def test_cache_is_separate_per_host(tmp_path, stub):
+    other = StubServer()
+    try:
+        make_client(tmp_path, stub.host).get(2017, "acs/acs5", "NAME", "state:13")
+        make_client(tmp_path, other.host).get(2017, "acs/acs5", "NAME", "state:13")
+        assert stub.data_requests == 1 and other.data_requests == 1
+    finally:
+        other.close()
+
+
+def test_invalid_request_is_not_sent(tmp_path, stub):
+    client = make_client(tmp_path, stub.host)
+    with pytest.raises(CensusRequestError):
+        client.get(2017, "acs/acs5", "B19013_002E", "state:13")
+    with pytest.raises(CensusRequestError):
+        client.get(2017, "acs/acs5", "NAME", "county:001")
+    assert stub.data_requests == 0
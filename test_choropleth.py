@@ -0,0 +1,36 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import geopandas
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from choropleth import ChoroplethMap
+
+
+def grid_frame(n=6):
+    """n x n unit squares indexed by GEOID-like strings, split into left and right halves."""
+    cells = [(i, j) for i in range(n) for j in range(n)]
+    return geopandas.GeoDataFrame(
+        {"D": [int(i >= n // 2) for i, j in cells], "TOTPOP": [i * n + j for i, j in cells]},
+        geometry=[box(i, j, i + 1, j + 1) for i, j in cells],
+        index=["13{:03d}{:03d}".format(i, j) for i, j in cells], crs="EPSG:3857")
+
+
+def test_column_plot_has_no_masked_faces():
+    df = grid_frame()
+    figure = ChoroplethMap(df).plot("TOTPOP")
+    assert not np.ma.getmaskarray(figure.collection.get_array()).any()
+
+
+def test_partition_plot_has_no_masked_faces():
+    gerrychain = pytest.importorskip("gerrychain")
+    df = grid_frame()
+    partition = gerrychain.Partition(gerrychain.Graph.from_geodataframe(df), "D")
+    figure = ChoroplethMap(df).plot(partition)
+    colors = figure.collection.get_array()
+    assert not np.ma.getmaskarray(colors).any()
+    assert list(figure.categories) == [0, 1]
+    assert (np.asarray(colors) == df["D"].to_numpy()).all()
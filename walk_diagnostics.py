@@ -0,0 +1,147 @@
+import json
+
+import numpy as np
+
+from grid_mcmc import metropolis_stepper
+
+
+class OnlineDiagnostics:
+    """Convergence diagnostics that are updated block by block as chains run.
+
+    Memory does not grow with the number of steps: besides the pooled visit
+    histogram, each chain keeps a running mean/variance of the observable,
+    lagged product sums up to max_lag and the last max_lag observable values.
+
+    target is the stationary distribution (e.g. the normalized `scores` of
+    mcmc_grid_walk.py) and observable[i] the value of the observable at node
+    id i, both as arrays indexed by node id.
+    """
+
+    def __init__(self, target, observable, n_chains=1, max_lag=100):
+        target = np.asarray(target, dtype=np.float64)
+        self.target = target / target.sum()
+        self.observable = np.asarray(observable, dtype=np.float64)
+        self.max_lag = max_lag
+        self.visits = np.zeros(len(target), dtype=np.int64)
+        self.counts = np.zeros(n_chains, dtype=np.int64)
+        self.means = np.zeros(n_chains)
+        self.m2 = np.zeros(n_chains)
+        self.lag_sums = np.zeros((n_chains, max_lag + 1))
+        self.lag_pairs = np.zeros((n_chains, max_lag + 1), dtype=np.int64)
+        self.tails = [np.empty(0) for _ in range(n_chains)]
+
+    @property
+    def steps(self):
+        return int(self.counts.sum())
+
+    def update(self, chain, block):
+        """Fold a block of states (node ids) from one chain into the statistics."""
+        np.add.at(self.visits, block, 1)
+        x = self.observable[block]
+        m = len(x)
+        if m == 0:
+            return
+
+        # Chan et al. parallel update of the running mean and variance.
+        n = self.counts[chain]
+        delta = x.mean() - self.means[chain]
+        total = n + m
+        self.m2[chain] += ((x - x.mean()) ** 2).sum() + delta ** 2 * n * m / total
+        self.means[chain] += delta * m / total
+        self.counts[chain] = total
+
+        # Lagged products x[t] * x[t+k] for every pair that ends in this block.
+        tail = self.tails[chain]
+        ext = np.concatenate([tail, x])
+        for k in range(self.max_lag + 1):
+            p0 = max(len(tail), k)
+            if p0 < len(ext):
+                self.lag_sums[chain, k] += np.dot(ext[p0 - k:len(ext) - k], ext[p0:])
+                self.lag_pairs[chain, k] += len(ext) - p0
+        self.tails[chain] = ext[-self.max_lag:] if self.max_lag else ext[:0]
+
+    def total_variation(self):
+        """Total variation distance of the pooled visit histogram to target."""
+        if self.steps == 0:
+            return 1.0
+        return 0.5 * np.abs(self.visits / self.steps - self.target).sum()
+
+    def autocorrelation(self):
+        """Autocorrelation of the observable at lags 0..max_lag, pooled over chains."""
+        variance = self.m2.sum() / max(self.steps, 1)
+        if variance == 0:
+            return np.ones(self.max_lag + 1)
+        mean = (self.means * self.counts).sum() / max(self.steps, 1)
+        pairs = self.lag_pairs.sum(axis=0)
+        covariance = self.lag_sums.sum(axis=0) / np.maximum(pairs, 1) - mean ** 2
+        return np.where(pairs > 0, covariance / variance, 0.0)
+
+    def effective_sample_size(self):
+        """Steps divided by the integrated autocorrelation time.
+
+        The autocorrelation sum is cut off at the first non-positive lag.
+        """
+        rho = self.autocorrelation()[1:]
+        cutoff = np.flatnonzero(rho <= 0)
+        if len(cutoff):
+            rho = rho[:cutoff[0]]
+        tau = 1 + 2 * rho.sum()
+        return self.steps / tau
+
+    def gelman_rubin(self):
+        """Potential scale reduction factor (R-hat) of the observable across chains."""
+        n = self.counts.min()
+        if len(self.counts) < 2 or n < 2:
+            return float("nan")
+        within = (self.m2 / (self.counts - 1)).mean()
+        between = self.means.var(ddof=1)
+        if within == 0:
+            return 1.0 if between == 0 else float("inf")
+        return float(np.sqrt(((n - 1) / n * within + between) / within))
+
+    def snapshot(self):
+        rho = self.autocorrelation()
+        return {
+            "steps": self.steps,
+            "tv": float(self.total_variation()),
+            "ess": float(self.effective_sample_size()),
+            "rhat": self.gelman_rubin(),
+            "rho1": float(rho[1]) if self.max_lag else 1.0,
+        }
+
+
+def run_until_converged(indptr, indices, weights, starts, observable, max_steps,
+                        block=10000, tv_tol=0.01, rhat_tol=1.01, seed=None,
+                        log=None, max_lag=100):
+    """Run one chain per start node until the diagnostics say it has converged.
+
+    Chains advance block steps at a time. After every round a snapshot is
+    written as a JSON line to log (a file object) when one is given, and the
+    run stops early once the total variation to the target is below tv_tol
+    and R-hat is below rhat_tol. Returns (diagnostics, final states).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    diagnostics = OnlineDiagnostics(weights, observable, n_chains=len(starts),
+                                    max_lag=max_lag)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    steppers = [metropolis_stepper(indptr, indices, weights, rng=s, chunk_size=block)
+                for s in seeds]
+    states = [int(s) for s in starts]
+
+    done = 0
+    while done < max_steps:
+        m = min(block, max_steps - done)
+        for j, advance in enumerate(steppers):
+            trace, states[j] = advance(states[j], m)
+            diagnostics.update(j, trace)
+        done += m
+
+        snap = diagnostics.snapshot()
+        if log is not None:
+            log.write(json.dumps(snap) + "\n")
+            log.flush()
+        rhat_ok = len(starts) < 2 or snap["rhat"] < rhat_tol
+        if snap["tv"] < tv_tol and rhat_ok:
+            break
+
+    return diagnostics, states
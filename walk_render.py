@@ -0,0 +1,110 @@
+import time
+
+import numpy as np
+import networkx as nx
+import matplotlib.pyplot as plt
+from matplotlib import animation
+
+from grid_mcmc import metropolis_hastings
+
+
+def edge_transition_counts(indptr, indices, states):
+    """Count the moves along every directed CSR slot in a state trace.
+
+    counts[s] is the number of steps that went from row i to indices[s],
+    for the slot s in indptr[i]:indptr[i+1]. Rejected proposals are not moves.
+    """
+    n = len(indptr) - 1
+    a = np.asarray(states[:-1], dtype=np.int64)
+    b = np.asarray(states[1:], dtype=np.int64)
+    moved = a != b
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+    keys = rows * n + indices
+    order = np.argsort(keys)
+    slots = order[np.searchsorted(keys[order], a[moved] * n + b[moved])]
+    return np.bincount(slots, minlength=len(indices))
+
+
+def record_walk(indptr, indices, weights, start, steps, rng=None):
+    """Headless run: no drawing and no per-step dicts, only the compact trace.
+
+    Returns (result, transitions, seconds) where result comes from
+    metropolis_hastings with the states trace recorded and transitions is
+    edge_transition_counts of that trace followed by the final state, so
+    the move made by the last step is counted too.
+    """
+    t = time.perf_counter()
+    result = metropolis_hastings(indptr, indices, weights, start, steps, rng=rng,
+                                 record_states=True)
+    path = np.append(result.states, result.state)
+    transitions = edge_transition_counts(indptr, indices, path)
+    return result, transitions, time.perf_counter() - t
+
+
+def _draw_frame(ax, g, nodes, index, states, t):
+    # Same coloring as the walk scripts: current node 1, previous node 2,
+    # and the edge that was just used 1.
+    node_colors = np.zeros(len(nodes))
+    state = nodes[states[t]]
+    if t > 0:
+        old_state = nodes[states[t - 1]]
+        node_colors[index[old_state]] = 2
+    node_colors[index[state]] = 1
+    edge_colors = [1 if t > 0 and {u, v} == {old_state, state} else 0 for u, v in g.edges()]
+    nx.draw(g, pos={x: x for x in g.nodes()}, ax=ax, nodelist=nodes,
+            node_color=node_colors, edge_color=edge_colors,
+            width=3, cmap="jet", vmin=0, vmax=2, edge_cmap=plt.cm.jet,
+            edge_vmin=0, edge_vmax=2)
+    ax.set_title("step {}".format(t))
+
+
+def render_strip(g, nodes, states, every=1, columns=5, path=None):
+    """Draw every k-th recorded step into one image strip.
+
+    Returns (fig, seconds). The figure is saved to path when one is given.
+    """
+    t = time.perf_counter()
+    frames = list(range(0, len(states), every))
+    rows = max(1, -(-len(frames) // columns))
+    fig, axes = plt.subplots(rows, columns, figsize=(3 * columns, 3 * rows), squeeze=False)
+    index = {x: i for i, x in enumerate(nodes)}
+    for ax, step in zip(axes.flat, frames):
+        _draw_frame(ax, g, nodes, index, states, step)
+    for ax in axes.flat[len(frames):]:
+        ax.axis("off")
+    if path is not None:
+        fig.savefig(path)
+    return fig, time.perf_counter() - t
+
+
+def render_video(g, nodes, states, path, every=1, fps=5):
+    """Write every k-th recorded step as a frame of a video (or gif).
+
+    Uses ffmpeg when matplotlib can find it and falls back to Pillow.
+    Returns the number of seconds spent rendering.
+    """
+    t = time.perf_counter()
+    fig, ax = plt.subplots()
+    index = {x: i for i, x in enumerate(nodes)}
+
+    def update(step):
+        ax.clear()
+        _draw_frame(ax, g, nodes, index, states, step)
+
+    frames = range(0, len(states), every)
+    anim = animation.FuncAnimation(fig, update, frames=frames)
+    if animation.writers.is_available("ffmpeg") and not path.endswith(".gif"):
+        writer = animation.FFMpegWriter(fps=fps)
+    else:
+        writer = animation.PillowWriter(fps=fps)
+    anim.save(path, writer=writer)
+    plt.close(fig)
+    return time.perf_counter() - t
+
+
+def cost_report(steps, sample_seconds, frames, render_seconds):
+    """Per-step sampling cost next to per-frame rendering cost, as a string."""
+    return ("sampling: {} steps in {:.3f}s ({:.2e} s/step)\n"
+            "rendering: {} frames in {:.3f}s ({:.2e} s/frame)").format(
+                steps, sample_seconds, sample_seconds / max(steps, 1),
+                frames, render_seconds, render_seconds / max(frames, 1))